@@ -2,12 +2,32 @@
 """
 API Test Script for Smart Ticketing System
 This script tests the ESP32 API endpoints to ensure they work correctly
+
+Load testing mode simulates many concurrent gates:
+    python api_test.py load --gates 50 --duration 60 --tickets 5000
+It logs in as an admin (--admin-user/--admin-password) and seeds and purges
+its data through /admin/loadtest on the server under test. The seeded event
+is inactive and everything the run created is deleted when it finishes.
+
+All simulated gates share one client IP, so each gate sends about
+1 / --think-time scans per second and the total is capped by
+RATE_LIMITS['scan']['ip'] (100/s by default). 50 gates at the default
+0.2s think time need ~250/s: raise RATE_LIMITS['scan'] in app.py on the
+server under test first (or drop its 'ip' entry), or the run measures the
+rate limiter instead. Behind a reverse proxy, set TRUSTED_PROXY_HOPS on the
+server so the limiter sees client IPs rather than the proxy's.
 """
 
+import argparse
+import math
+import random
 import requests
 import json
 import secrets
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Configuration
@@ -204,6 +224,153 @@ def run_comprehensive_test():
     else:
         print("❌ Some tests failed. Check the Flask server and configuration.")
 
+# Load testing
+MAX_RATE_LIMITED_SHARE = 0.05  # above this share of 429s the results say nothing about capacity
+
+SCAN_MIX = {  # share of scans per kind
+    'valid': 0.70,
+    'reused': 0.15,
+    'invalid': 0.10,
+    'unpaid': 0.05,
+}
+
+def admin_session(username, password):
+    """Logged-in session for the admin endpoints the load test seeds and purges through"""
+    session = requests.Session()
+    response = session.post(f'{SERVER_URL}/login', json={'username': username, 'password': password}, timeout=10)
+    if response.status_code != 200:
+        raise RuntimeError(f'Admin login failed ({response.status_code}); check --admin-user/--admin-password')
+    return session
+
+def seed_load_test_data(session, paid_count, unpaid_count):
+    """Have the server create an inactive event with paid and unpaid tickets; returns its seed description"""
+    response = session.post(f'{SERVER_URL}/admin/loadtest',
+                            json={'paid': paid_count, 'unpaid': unpaid_count}, timeout=600)
+    if response.status_code != 201:
+        raise RuntimeError(f'Seeding failed ({response.status_code}): {response.text[:200]}')
+    return response.json()
+
+def cleanup_load_test_data(session, seed):
+    """Delete the seeded event, user and tickets plus the scans and gates the run produced"""
+    response = session.post(f'{SERVER_URL}/admin/loadtest/purge',
+                            json={'event_id': seed['event_id'], 'user_id': seed['user_id']}, timeout=60)
+    if response.status_code != 200:
+        raise RuntimeError(f'Cleanup failed ({response.status_code}): {response.text[:200]}')
+
+class ScanPool:
+    """Hands out QR codes per scan kind so gates replay a realistic mix"""
+    
+    def __init__(self, paid_codes, unpaid_codes):
+        self._lock = threading.Lock()
+        self._unused = list(paid_codes)
+        random.shuffle(self._unused)
+        self._used = []
+        self._unpaid = unpaid_codes
+    
+    def next_scan(self):
+        kind = random.choices(list(SCAN_MIX), weights=list(SCAN_MIX.values()))[0]
+        with self._lock:
+            if kind == 'valid' and self._unused:
+                qr_code = self._unused.pop()
+                self._used.append(qr_code)
+                return kind, qr_code
+            if kind in ('valid', 'reused') and self._used:
+                return 'reused', random.choice(self._used)
+            if kind == 'unpaid' and self._unpaid:
+                return kind, random.choice(self._unpaid)
+        return 'invalid', secrets.token_urlsafe(32)
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+def run_gate(device_id, pool, deadline, think_time, status_interval, results):
+    """One simulated gate: keep-alive session, scans plus periodic heartbeats"""
+    session = requests.Session()
+    next_status = time.monotonic()
+    samples = []
+    
+    while time.monotonic() < deadline:
+        if time.monotonic() >= next_status:
+            kind, url = 'device_status', f'{SERVER_URL}/api/device_status'
+            payload = {'device_id': device_id, 'status': 'online', 'door_open': False,
+                       'wifi_strength': random.randint(-80, -40), 'uptime': int(time.monotonic())}
+            next_status += status_interval
+        else:
+            kind, qr_code = pool.next_scan()
+            url = f'{SERVER_URL}/api/validate_qr'
+            payload = {'qr_code': qr_code, 'device_id': device_id}
+        
+        started = time.perf_counter()
+        try:
+            status_code = session.post(url, json=payload, timeout=10).status_code
+        except requests.RequestException:
+            status_code = 'error'
+        samples.append((kind, status_code, time.perf_counter() - started))
+        if think_time:
+            time.sleep(think_time)
+    
+    results.extend(samples)
+
+def rate_limited_share(results):
+    scans = [status_code for kind, status_code, _ in results if kind != 'device_status']
+    return sum(status_code == 429 for status_code in scans) / len(scans) if scans else 0.0
+
+def print_load_report(results, elapsed):
+    by_kind = defaultdict(list)
+    codes = defaultdict(lambda: defaultdict(int))
+    for kind, status_code, latency in results:
+        by_kind[kind].append(latency * 1000)
+        codes[kind][status_code] += 1
+    
+    print("\n" + "="*90)
+    print("LOAD TEST REPORT")
+    print("="*90)
+    print(f"Requests: {len(results)} in {elapsed:.1f}s ({len(results) / elapsed:,.1f} req/s)")
+    print(f"\n{'Outcome':<15}{'Count':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  Status codes")
+    for kind in sorted(by_kind):
+        latencies = sorted(by_kind[kind])
+        status_codes = ', '.join(f'{code}: {count}' for code, count in sorted(codes[kind].items(), key=str))
+        print(f"{kind:<15}{len(latencies):>8}{len(latencies) / elapsed:>10.1f}"
+              f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+              f"{percentile(latencies, 99):>10.1f}  {status_codes}")
+
+def run_load_test(gates, duration, tickets, think_time, status_interval, admin_user, admin_password):
+    """Simulate concurrent gates against the validation and status endpoints; returns False if throttled"""
+    session = admin_session(admin_user, admin_password)
+    
+    print(f"Seeding {tickets} paid tickets...")
+    seed = seed_load_test_data(session, tickets, max(1, tickets // 20))
+    try:
+        ip_rate = seed['rate_limits']['scan']['ip'][0]
+        if think_time <= 0 or gates / think_time > ip_rate:
+            print(f"⚠️  {gates} gates at {think_time}s think time exceed the scan limit of "
+                  f"{ip_rate}/s per IP; raise RATE_LIMITS['scan'] on the server under test\n")
+        
+        pool = ScanPool(seed['paid'], seed['unpaid'])
+        
+        print(f"Running {gates} gates for {duration}s against {SERVER_URL}...")
+        results = []
+        deadline = time.monotonic() + duration
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=gates) as executor:
+            for gate_number in range(gates):
+                executor.submit(run_gate, f"{seed['device_prefix']}{gate_number:03d}", pool, deadline,
+                                think_time, status_interval, results)
+        print_load_report(results, time.perf_counter() - started)
+    finally:
+        # The server flushes its buffered entry logs and drops buffered telemetry first
+        cleanup_load_test_data(session, seed)
+        print("\nLoad test data removed")
+    
+    share = rate_limited_share(results)
+    if share > MAX_RATE_LIMITED_SHARE:
+        print(f"❌ {share:.0%} of scans were rate limited (429); these numbers measure the limiter, "
+              f"not capacity. Raise RATE_LIMITS['scan'] on the server or use fewer gates.")
+        return False
+    return True
+
 def test_server_connectivity():
     """Test basic server connectivity"""
     print("Testing server connectivity...")
@@ -224,6 +391,20 @@ def test_server_connectivity():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smart Ticketing System - ESP32 API Test")
+    parser.add_argument("--server", default=SERVER_URL, help="Server URL")
+    subparsers = parser.add_subparsers(dest="mode")
+    load_parser = subparsers.add_parser("load", help="Simulate many concurrent gates")
+    load_parser.add_argument("--gates", type=int, default=20, help="Concurrent simulated gates")
+    load_parser.add_argument("--duration", type=int, default=30, help="Test duration in seconds")
+    load_parser.add_argument("--tickets", type=int, default=2000, help="Paid tickets to seed")
+    load_parser.add_argument("--think-time", type=float, default=0.2, help="Pause between scans per gate")
+    load_parser.add_argument("--status-interval", type=float, default=5.0, help="Seconds between heartbeats")
+    load_parser.add_argument("--admin-user", default="admin", help="Admin account used to seed and clean up")
+    load_parser.add_argument("--admin-password", default="admin123", help="Password of the admin account")
+    args = parser.parse_args()
+    SERVER_URL = args.server.rstrip("/")
+    
     print("Smart Ticketing System - ESP32 API Test")
     print("Make sure the Flask server is running before starting tests.\n")
     
@@ -233,6 +414,11 @@ if __name__ == "__main__":
         print("python app.py")
         exit(1)
     
+    if args.mode == "load":
+        ok = run_load_test(args.gates, args.duration, args.tickets, args.think_time, args.status_interval,
+                           args.admin_user, args.admin_password)
+        exit(0 if ok else 1)
+    
     # Run comprehensive tests
     run_comprehensive_test()
     
@@ -1,27 +1,162 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, abort, Response, g, has_request_context
+from flask.globals import app_ctx
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import scoped_session, sessionmaker
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import qrcode
 import io
 import base64
+import bisect
+import cProfile
+import hashlib
+import hmac
+import struct
+import sys
 import uuid
 import secrets
+import sqlite3
 import requests
 import json
-from functools import wraps
+import math
+import atexit
+import os
+import pstats
+import queue
+import random
+import re
+import threading
+import time
+import click
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import wraps, lru_cache
+
+def pool_options(uri):
+    """Pool sizing for an engine URI; in-memory SQLite runs on StaticPool, which takes none"""
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),  # connections kept open per engine
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),  # extra connections under load
+        'pool_timeout': 10,  # seconds to wait for a free connection
+    }
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-this'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///smart_ticketing.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///smart_ticketing.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_options(app.config['SQLALCHEMY_DATABASE_URI'])
+if os.environ.get('DATABASE_REPLICA_URL'):
+    # Heavy read views go here; without it they read the primary on their own connection
+    replica_url = os.environ['DATABASE_REPLICA_URL']
+    app.config['SQLALCHEMY_BINDS'] = {'replica': {'url': replica_url, **pool_options(replica_url)}}
+app.config['SQLITE_JOURNAL_MODE'] = 'WAL'  # readers and the writer no longer block each other
+app.config['SQLITE_SYNCHRONOUS'] = 'NORMAL'  # fsync at checkpoints only; safe with WAL
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = 5000  # how long a writer waits for the lock before failing
+app.config['PAYMENT_WORKERS'] = 8  # concurrent calls to the mobile money provider
+app.config['PAYMENT_QUEUE_SIZE'] = 256  # payments accepted but not yet settled
+app.config['PAYMENT_SETTLE_ATTEMPTS'] = 5  # tries to record a payment outcome before leaving it to the sweep
+app.config['PAYMENT_PENDING_TIMEOUT'] = 15  # minutes a payment may stay pending before it is failed
+app.config['PAYMENT_SWEEP_INTERVAL'] = 60  # seconds between sweeps for stale pending payments
+app.config['QR_CACHE_SIZE'] = 2048  # rendered QR PNGs kept in memory
+app.config['BULK_ISSUE_BATCH_SIZE'] = 1000  # ticket rows per insert transaction
+app.config['VALIDATION_INDEX_TTL'] = 60  # seconds between gate index reloads
+app.config['VALIDATION_NEGATIVE_TTL'] = 30  # seconds an unknown QR code stays cached
+app.config['VALIDATION_NEGATIVE_SIZE'] = 10000  # unknown QR codes kept per process
+app.config['ENTRY_LOG_BATCH_SIZE'] = 500  # entry logs per bulk insert
+app.config['ENTRY_LOG_FLUSH_INTERVAL'] = 1.0  # max seconds an entry log waits in memory
+app.config['GATE_MANIFEST_KEY'] = 'your-gate-manifest-key-change-this'  # HMAC key shared with gates
+app.config['MANIFEST_HASH_BYTES'] = 8  # truncated SHA-256 per QR code in offline manifests
+app.config['MANIFEST_DELTA_LIMIT'] = 5000  # changes per delta response
+app.config['MANIFEST_CACHE_SIZE'] = 16  # events whose signed manifest is kept in memory
+app.config['MANIFEST_CACHE_TTL'] = 600  # seconds a manifest nobody asked for stays cached
+app.config['SCAN_BATCH_LIMIT'] = 5000  # scans per /api/validate_qr_batch request
+app.config['ADMIN_PAGE_SIZE'] = 50  # rows per page in the admin listings
+app.config['DASHBOARD_PAGE_SIZE'] = 24  # tickets per page on the user dashboard
+app.config['CATALOG_PAGE_SIZE'] = 24  # events per page on the public catalog
+app.config['CATALOG_CACHE_TTL'] = 30  # seconds other workers may serve a stale catalog
+app.config['CATALOG_CACHE_SIZE'] = 256  # cached catalog pages and responses
+app.config['TELEMETRY_HISTORY'] = 120  # recent heartbeats kept in memory per device
+app.config['TELEMETRY_MAX_DEVICES'] = 5000  # devices tracked in memory per process
+app.config['TELEMETRY_ROLLUP_SECONDS'] = 60  # width of the stored telemetry buckets
+app.config['TELEMETRY_FLUSH_INTERVAL'] = 10  # seconds between telemetry writes
+app.config['ENTRY_STREAM_QUEUE_SIZE'] = 500  # undelivered live events per admin screen
+app.config['ENTRY_STREAM_KEEPALIVE'] = 15  # seconds between SSE keep-alive comments
+app.config['RATE_LIMITS'] = {  # (requests per second, burst) per device_id and, if listed, per client IP
+    'scan': {'device': (10, 20), 'ip': (100, 200)},
+    'status': {'device': (1, 5), 'ip': (50, 100)},
+}
+app.config['TRUSTED_PROXY_HOPS'] = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))  # proxies whose X-Forwarded-For names the client
+app.config['RATE_LIMIT_MAX_KEYS'] = 10000  # buckets kept per limiter, least recently used evicted
+app.config['SCAN_DEDUP_WINDOW'] = 2  # seconds an identical scan from the same device reuses its decision
+app.config['SIGNED_QR_CODES'] = False  # issue self-verifying QR payloads instead of random tokens
+app.config['QR_SIGNING_KEY'] = 'your-qr-signing-key-change-this'  # HMAC key shared with gates
+app.config['METRICS_TOKEN'] = None  # bearer token required by /metrics when set
+app.config['METRICS_MAX_DEVICES'] = 1000  # distinct device_id labels before scans are counted as 'other'
+app.config['SQL_PROFILER'] = False  # record per-request SQL and flag repeated statements
+app.config['SQL_PROFILER_REPEAT_THRESHOLD'] = 5  # identical statement shapes in one request that look like N+1
+app.config['PROFILE_SAMPLE_RATE'] = 0.0  # fraction of requests run under cProfile
+app.config['PROFILE_THRESHOLD_MS'] = 500  # sampled requests slower than this are written out
+app.config['PROFILE_DIR'] = 'profiles'  # where request profiles are written
+app.config['PROFILE_DIR_MAX_BYTES'] = 50 * 1024 * 1024  # oldest profiles are removed beyond this
+app.config['USER_CACHE_TTL'] = 30  # seconds another worker may serve a stale identity, admin rights included
+app.config['USER_CACHE_SIZE'] = 10000  # signed-in identities kept per process
+
+if app.config['TRUSTED_PROXY_HOPS']:
+    # Behind a reverse proxy remote_addr is the proxy, which would put every gate in one IP bucket
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'])
 
 db = SQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Database connections
+@sa_event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Journal mode, durability and lock wait for every new SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={app.config['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    cursor.close()
+
+class ReadOnlySession(FlaskSession):
+    """Reads from the replica bind when one is configured; refuses to flush changes"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engines = self._db.engines
+        return engines['replica'] if 'replica' in engines else engines[None]
+    
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise RuntimeError('read_session is read-only; write through db.session')
+
+def _app_context_id():
+    return id(app_ctx._get_current_object())
+
+# Same app-context scoping as db.session, for the report and catalog views
+read_session = scoped_session(
+    sessionmaker(class_=ReadOnlySession, db=db, query_cls=db.Query, autoflush=False),
+    scopefunc=_app_context_id
+)
+
+@app.teardown_appcontext
+def remove_read_session(exc):
+    read_session.remove()
+
 # Database Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -32,6 +167,11 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     tickets = db.relationship('Ticket', backref='user', lazy=True)
+    ticket_count = db.query_expression()  # filled in by admin listings
+    __table_args__ = (
+        db.Index('ix_user_phone', 'phone'),
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+    )
 
 class Event(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -41,6 +181,10 @@ class Event(db.Model):
     date = db.Column(db.DateTime, nullable=False)
     location = db.Column(db.String(200), nullable=False)
     max_capacity = db.Column(db.Integer, default=100)
+    reserved_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # pending tickets
+    sold_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # paid tickets
+    used_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # admitted tickets
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default='0')  # paid, non-complimentary
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     tickets = db.relationship('Ticket', backref='event', lazy=True)
@@ -48,7 +192,7 @@ class Event(db.Model):
 class Ticket(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
-    qr_code = db.Column(db.String(36), unique=True, nullable=False)
+    qr_code = db.Column(db.String(64), unique=True, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
     payment_status = db.Column(db.String(20), default='pending')  # pending, paid, failed
@@ -56,23 +200,94 @@ class Ticket(db.Model):
     is_used = db.Column(db.Boolean, default=False)
     purchase_date = db.Column(db.DateTime, default=datetime.utcnow)
     used_date = db.Column(db.DateTime)
-    qr_image_data = db.Column(db.Text)  # Base64 encoded QR image
+    is_complimentary = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    __table_args__ = (
+        db.Index('ix_ticket_user_id_purchase_date', 'user_id', 'purchase_date'),
+        db.Index('ix_ticket_event_id_payment_status_is_used', 'event_id', 'payment_status', 'is_used'),
+        db.Index('ix_ticket_payment_status_purchase_date', 'payment_status', 'purchase_date'),
+    )
+    qr_image_data = db.deferred(db.Column(db.Text))  # Legacy base64 QR image, no longer populated
 
 class EntryLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=True)  # None for unknown codes
     entry_time = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20))  # granted, denied
     device_id = db.Column(db.String(50))  # ESP32 device identifier
     ticket = db.relationship('Ticket', backref='entry_logs')
+    __table_args__ = (
+        db.Index('ix_entry_log_entry_time', 'entry_time'),
+        db.Index('ix_entry_log_ticket_id', 'ticket_id'),
+    )
+
+class TicketChange(db.Model):
+    """Append-only feed of gate-relevant ticket changes, polled by offline gates"""
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
+    qr_code = db.Column(db.String(64), nullable=False)
+    change = db.Column(db.String(10), nullable=False)  # added, used, revoked
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_ticket_change_event_id_id', 'event_id', 'id'),)
+
+class Device(db.Model):
+    id = db.Column(db.String(50), primary_key=True)  # ESP32 device identifier
+    status = db.Column(db.String(20))
+    wifi_strength = db.Column(db.Integer)  # dBm
+    uptime = db.Column(db.Integer)  # seconds
+    door_open = db.Column(db.Boolean)
+    first_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen = db.Column(db.DateTime)
+
+class DeviceTelemetry(db.Model):
+    """Per-device heartbeat/scan rollup over TELEMETRY_ROLLUP_SECONDS"""
+    id = db.Column(db.Integer, primary_key=True)
+    device_id = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    heartbeats = db.Column(db.Integer, nullable=False, default=0)
+    scans = db.Column(db.Integer, nullable=False, default=0)
+    wifi_avg = db.Column(db.Float)
+    wifi_min = db.Column(db.Integer)
+    door_open_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.Index('ix_device_telemetry_device_id_bucket_start', 'device_id', 'bucket_start'),)
+
+class SchemaMigration(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class UserIdentity(UserMixin):
+    """The signed-in user as current_user sees it; a detached snapshot of User"""
+    
+    def __init__(self, id, username, phone, is_admin):
+        self.id = id
+        self.username = username
+        self.phone = phone
+        self.is_admin = bool(is_admin)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """Identity from the per-process cache; one narrow query on a miss"""
+    user_id = int(user_id)
+    identity = user_cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(
+            db.select(User.id, User.username, User.phone, User.is_admin).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        identity = UserIdentity(*row)
+        user_cache.set(user_id, identity)
+    return identity
+
+@sa_event.listens_for(User, 'after_update')
+@sa_event.listens_for(User, 'after_delete')
+def invalidate_user_identity(mapper, connection, target):
+    """Changes made by this worker apply at once; other workers catch up within USER_CACHE_TTL"""
+    user_cache.pop(target.id)
 
 # Helper Functions
 def generate_qr_code(data):
-    """Generate QR code and return base64 encoded image"""
+    """Generate QR code and return PNG image bytes"""
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
     qr.add_data(data)
     qr.make(fit=True)
@@ -82,7 +297,130 @@ def generate_qr_code(data):
     img.save(buffer, format='PNG')
     buffer.seek(0)
     
-    return base64.b64encode(buffer.getvalue()).decode()
+    return buffer.getvalue()
+
+@lru_cache(maxsize=app.config['QR_CACHE_SIZE'])
+def get_qr_png(data):
+    """Rendered QR PNG for a ticket code, memoised in a bounded LRU cache"""
+    return generate_qr_code(data)
+
+# Signed QR payloads: 'TK1:' + unpadded base32 of
+# version u8, ticket pk u32, event id u32, event date u32 (epoch minutes), truncated HMAC-SHA256
+SIGNED_QR_PREFIX = 'TK1:'
+SIGNED_QR_BODY = struct.Struct('>BIII')
+SIGNED_QR_VERSION = 1
+SIGNED_QR_MAC_BYTES = 10
+
+SignedQR = namedtuple('SignedQR', ['ticket_pk', 'event_id', 'event_date'])
+
+def _qr_mac(body):
+    key = app.config['QR_SIGNING_KEY'].encode()
+    return hmac.new(key, body, hashlib.sha256).digest()[:SIGNED_QR_MAC_BYTES]
+
+def sign_ticket_qr(ticket_pk, event_id, event_date):
+    """Self-verifying QR content binding a ticket to its event and date"""
+    minutes = int(event_date.replace(tzinfo=timezone.utc).timestamp() // 60)
+    body = SIGNED_QR_BODY.pack(SIGNED_QR_VERSION, ticket_pk, event_id, minutes)
+    encoded = base64.b32encode(body + _qr_mac(body)).decode().rstrip('=')
+    return SIGNED_QR_PREFIX + encoded
+
+def verify_ticket_qr(qr_code):
+    """Decode a signed QR payload; None if it is malformed or the MAC does not match"""
+    encoded = qr_code[len(SIGNED_QR_PREFIX):]
+    try:
+        raw = base64.b32decode(encoded + '=' * (-len(encoded) % 8))
+    except ValueError:
+        return None
+    if len(raw) != SIGNED_QR_BODY.size + SIGNED_QR_MAC_BYTES:
+        return None
+    body, mac = raw[:SIGNED_QR_BODY.size], raw[SIGNED_QR_BODY.size:]
+    if not hmac.compare_digest(mac, _qr_mac(body)):
+        return None
+    version, ticket_pk, event_id, minutes = SIGNED_QR_BODY.unpack(body)
+    if version != SIGNED_QR_VERSION:
+        return None
+    return SignedQR(ticket_pk, event_id, datetime.utcfromtimestamp(minutes * 60))
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+    
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = TTLCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+
+def keyset_page(query, columns, cursor, per_page, descending=True, key=None):
+    """
+    One page of `query` ordered by the (datetime, id) column pair, resuming
+    after `cursor`. Returns (rows, next_cursor); next_cursor is None on the last page.
+    `key` maps a row to its (datetime, id) when the columns are not attributes of the row.
+    """
+    sort_column, id_column = columns
+    if cursor:
+        try:
+            value, last_id = cursor.rsplit('_', 1)
+            after = (datetime.fromisoformat(value), int(last_id))
+        except ValueError:
+            abort(400)
+        position = db.tuple_(sort_column, id_column)
+        query = query.filter(position < after if descending else position > after)
+    
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    rows = query.limit(per_page + 1).all()
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        if key is None:
+            key = lambda row: (getattr(row, sort_column.key), getattr(row, id_column.key))
+        last_value, last_id = key(rows[-1])
+        next_cursor = f'{last_value.isoformat()}_{last_id}'
+    return rows, next_cursor
+
+def prefix_match(column, prefix):
+    """Index-friendly `column LIKE 'prefix%'` as a range scan (case-sensitive)"""
+    # Smallest string above every match: bump the last character that can be bumped,
+    # stepping over the surrogate block, which cannot be bound as a parameter
+    upper = prefix.rstrip(chr(sys.maxunicode))
+    if not upper:
+        return column >= prefix
+    following = ord(upper[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000
+    return db.and_(column >= prefix, column < upper[:-1] + chr(following))
 
 def admin_required(f):
     @wraps(f)
@@ -92,6 +430,62 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def reserve_ticket(event_id):
+    """
+    Atomically hold a seat for a pending ticket.
+    Returns False when the event is sold out; the caller commits.
+    """
+    result = db.session.execute(
+        db.update(Event)
+        .where(Event.id == event_id,
+               Event.reserved_count + Event.sold_count < Event.max_capacity)
+        .values(reserved_count=Event.reserved_count + 1)
+    )
+    return result.rowcount == 1
+
+def release_reservation(event_id, sold):
+    """Turn a held seat into a sale, or give it back if the payment failed"""
+    values = {'reserved_count': Event.reserved_count - 1}
+    if sold:
+        values['sold_count'] = Event.sold_count + 1
+        values['revenue'] = Event.revenue + Event.price
+    db.session.execute(db.update(Event).where(Event.id == event_id).values(**values))
+
+def record_entries(admitted):
+    """Bump used_count for {event_id: tickets admitted}; the caller commits"""
+    for event_id, count in admitted.items():
+        db.session.execute(
+            db.update(Event).where(Event.id == event_id)
+            .values(used_count=Event.used_count + count)
+        )
+
+def compute_event_stats():
+    """
+    Per-event reserved/sold/used/revenue straight from the tickets, in one
+    grouped aggregate. Used to backfill and reconcile the counters on Event.
+    """
+    paid = Ticket.payment_status == 'paid'
+    return (db.session.query(
+                Ticket.event_id,
+                db.func.sum(db.case((Ticket.payment_status == 'pending', 1), else_=0)),
+                db.func.sum(db.case((paid, 1), else_=0)),
+                db.func.sum(db.case((Ticket.is_used == True, 1), else_=0)),
+                db.func.sum(db.case((db.and_(paid, Ticket.is_complimentary == False), Event.price), else_=0)))
+            .join(Event, Ticket.event_id == Event.id)
+            .group_by(Ticket.event_id)
+            .all())
+
+def rebuild_event_stats():
+    """Reset the reserved/sold/used/revenue counters on every event from the tickets"""
+    stats = {event_id: counters for event_id, *counters in compute_event_stats()}
+    event_ids = db.session.scalars(db.select(Event.id)).all()
+    if event_ids:
+        db.session.execute(db.update(Event), [
+            {'id': event_id, 'reserved_count': reserved, 'sold_count': sold, 'used_count': used, 'revenue': revenue}
+            for event_id in event_ids
+            for reserved, sold, used, revenue in [stats.get(event_id, (0, 0, 0, 0))]
+        ])
+
 def process_mobile_payment(phone, amount, reference):
     """
     Simulate mobile money payment processing
@@ -122,11 +516,1208 @@ def process_mobile_payment(phone, amount, reference):
             'message': f'Payment error: {str(e)}'
         }
 
+# Background payment pipeline
+_payment_pool = None
+_payment_pool_lock = threading.Lock()
+_payment_slots = None
+
+def get_payment_pool():
+    """Return the shared payment worker pool, creating it on first use"""
+    global _payment_pool, _payment_slots
+    with _payment_pool_lock:
+        if _payment_pool is None:
+            _payment_pool = ThreadPoolExecutor(
+                max_workers=app.config['PAYMENT_WORKERS'],
+                thread_name_prefix='payment'
+            )
+            _payment_slots = threading.BoundedSemaphore(app.config['PAYMENT_QUEUE_SIZE'])
+    return _payment_pool
+
+def submit_payment(ticket_pk, phone, amount, reference):
+    """
+    Queue a payment for background settlement.
+    Returns False when the queue is full so the caller can shed load.
+    """
+    pool = get_payment_pool()
+    if not _payment_slots.acquire(blocking=False):
+        return False
+    try:
+        pool.submit(settle_payment, ticket_pk, phone, amount, reference)
+    except RuntimeError:
+        _payment_slots.release()
+        return False
+    return True
+
+def settle_payment(ticket_pk, phone, amount, reference):
+    """Run the mobile money call and record the outcome on the ticket"""
+    try:
+        started = time.perf_counter()
+        payment_result = process_mobile_payment(phone, amount, reference)
+        metrics.observe('payment_duration_seconds', (payment_result['status'],), time.perf_counter() - started)
+        
+        # The provider is never called twice; only recording its answer is retried
+        attempts = app.config['PAYMENT_SETTLE_ATTEMPTS']
+        for attempt in range(attempts):
+            try:
+                with app.app_context():
+                    record_payment_result(ticket_pk, payment_result, reference)
+                return
+            except OperationalError as e:
+                app.logger.warning(f'Recording payment for ticket {ticket_pk} failed, attempt {attempt + 1}: {e}')
+                time.sleep(0.5 * 2 ** attempt)
+        app.logger.error(f'Gave up recording payment for ticket {ticket_pk} after {attempts} attempts; '
+                         f'the pending sweep will fail it ({payment_result})')
+    except Exception as e:
+        app.logger.exception(f'Payment settlement failed for ticket {ticket_pk}: {e}')
+    finally:
+        _payment_slots.release()
+
+def record_payment_result(ticket_pk, payment_result, reference):
+    """Settle a still-pending ticket; a ticket the sweep already failed is left alone"""
+    paid = payment_result['status'] == 'success'
+    ticket = db.session.execute(
+        db.update(Ticket)
+        .where(Ticket.id == ticket_pk, Ticket.payment_status == 'pending')
+        .values(payment_status='paid' if paid else 'failed',
+                payment_reference=payment_result['transaction_id'] if paid else reference)
+        .returning(Ticket.event_id, Ticket.qr_code)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if ticket is None:
+        if paid:
+            app.logger.warning(f"Payment {payment_result['transaction_id']} arrived for ticket {ticket_pk} "
+                               f'after it stopped pending; refund or reissue manually')
+        db.session.rollback()
+        return
+    release_reservation(ticket.event_id, sold=paid)
+    if paid:
+        db.session.add(TicketChange(event_id=ticket.event_id, qr_code=ticket.qr_code, change='added'))
+    db.session.commit()
+    validation_index.update(ticket.qr_code, payment_status='paid' if paid else 'failed')
+
+def expire_stale_payments():
+    """
+    Fail tickets pending longer than PAYMENT_PENDING_TIMEOUT minutes - their
+    payment was lost to a restart or never recorded - and give the seats back.
+    Commits; returns how many tickets were expired.
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=app.config['PAYMENT_PENDING_TIMEOUT'])
+    expired = db.session.execute(
+        db.update(Ticket)
+        .where(Ticket.payment_status == 'pending', Ticket.purchase_date < cutoff)
+        .values(payment_status='failed')
+        .returning(Ticket.event_id, Ticket.qr_code)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for event_id, count in Counter(event_id for event_id, _ in expired).items():
+        db.session.execute(
+            db.update(Event).where(Event.id == event_id)
+            .values(reserved_count=Event.reserved_count - count)
+        )
+    db.session.commit()
+    for _, qr_code in expired:
+        validation_index.update(qr_code, payment_status='failed')
+    return len(expired)
+
+_payment_sweeper = None
+
+def _sweep_stale_payments():
+    while True:
+        try:
+            with app.app_context():
+                expired = expire_stale_payments()
+            if expired:
+                app.logger.warning(f'Expired {expired} payments left pending')
+        except Exception as e:
+            app.logger.exception(f'Pending payment sweep failed: {e}')
+        time.sleep(app.config['PAYMENT_SWEEP_INTERVAL'])
+
+@app.before_request
+def start_payment_sweeper():
+    """Every serving worker sweeps; the conditional update makes overlapping sweeps harmless"""
+    global _payment_sweeper
+    if _payment_sweeper is not None:
+        return
+    with _payment_pool_lock:
+        if _payment_sweeper is None:
+            _payment_sweeper = threading.Thread(target=_sweep_stale_payments, name='payment-sweeper', daemon=True)
+            _payment_sweeper.start()
+
+# Bulk ticket issuance
+def issue_complimentary_tickets(event, users, count):
+    """
+    Issue `count` paid complimentary tickets per user for an event.
+    Seats are taken from inventory in one conditional update and the rows are
+    inserted in batched transactions. Returns (tickets, elapsed_seconds).
+    """
+    started = time.perf_counter()
+    total = count * len(users)
+    
+    result = db.session.execute(
+        db.update(Event)
+        .where(Event.id == event.id,
+               Event.reserved_count + Event.sold_count + total <= Event.max_capacity)
+        .values(sold_count=Event.sold_count + total)
+    )
+    if result.rowcount != 1:
+        db.session.rollback()
+        raise ValueError(f'Not enough capacity left for {total} tickets')
+    db.session.commit()
+    
+    batch_reference = f'COMP{secrets.token_hex(4).upper()}'
+    batch_size = app.config['BULK_ISSUE_BATCH_SIZE']
+    tickets = []
+    issued = 0
+    try:
+        for user in users:
+            for _ in range(count):
+                tickets.append({
+                    'ticket_id': str(uuid.uuid4()),
+                    'qr_code': secrets.token_urlsafe(32),
+                    'user_id': user.id,
+                    'event_id': event.id,
+                    'payment_status': 'paid',
+                    'payment_reference': batch_reference,
+                    'is_used': False,
+                    'is_complimentary': True,
+                    'purchase_date': datetime.utcnow()
+                })
+        for offset in range(0, total, batch_size):
+            batch = tickets[offset:offset + batch_size]
+            if app.config['SIGNED_QR_CODES']:
+                # Signed codes embed the row id, so insert first and rewrite the codes
+                ids = db.session.scalars(
+                    db.insert(Ticket).returning(Ticket.id, sort_by_parameter_order=True), batch
+                ).all()
+                for ticket, ticket_pk in zip(batch, ids):
+                    ticket['qr_code'] = sign_ticket_qr(ticket_pk, event.id, event.date)
+                db.session.execute(db.update(Ticket), [
+                    {'id': ticket_pk, 'qr_code': ticket['qr_code']} for ticket, ticket_pk in zip(batch, ids)
+                ])
+            else:
+                db.session.execute(db.insert(Ticket), batch)
+            db.session.execute(db.insert(TicketChange), [
+                {'event_id': event.id, 'qr_code': t['qr_code'], 'change': 'added'} for t in batch
+            ])
+            db.session.commit()
+            issued = min(offset + batch_size, total)
+    except Exception:
+        db.session.rollback()
+        # Give back the seats of the batches that never made it in
+        db.session.execute(
+            db.update(Event).where(Event.id == event.id)
+            .values(sold_count=Event.sold_count - (total - issued))
+        )
+        db.session.commit()
+        raise
+    
+    return tickets, time.perf_counter() - started
+
+def render_qr_files(tickets, directory, workers=None):
+    """Render QR PNGs for issued tickets into a directory using a process pool"""
+    os.makedirs(directory, exist_ok=True)
+    codes = [ticket['qr_code'] for ticket in tickets]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        images = pool.map(generate_qr_code, codes, chunksize=64)
+        for ticket, image in zip(tickets, images):
+            with open(os.path.join(directory, f"{ticket['ticket_id']}.png"), 'wb') as f:
+                f.write(image)
+
+# Gate validation index
+GateEntry = namedtuple('GateEntry', [
+    'id', 'ticket_id', 'payment_status', 'is_used', 'event_id', 'event_date', 'event_name', 'holder_name'
+])
+
+def gate_entry_query():
+    """GateEntry columns followed by qr_code, for one or many tickets"""
+    return (db.session.query(
+                Ticket.id, Ticket.ticket_id, Ticket.payment_status, Ticket.is_used,
+                Event.id, Event.date, Event.name, User.username, Ticket.qr_code)
+            .join(Event, Ticket.event_id == Event.id)
+            .join(User, Ticket.user_id == User.id))
+
+def event_in_entry_window(event_date, now):
+    """Gates only admit tickets for events happening today (within 24 hours)"""
+    return abs((event_date - now).days) <= 1
+
+class ValidationIndex:
+    """
+    Per-process qr_code -> GateEntry map for events inside the entry window.
+    Only monotonic facts are trusted from memory: a paid ticket stays paid and
+    a used ticket stays used. Anything else falls through to the database, and
+    the grant itself is a conditional UPDATE so workers cannot double-admit.
+    Reloads run on a background thread; scans keep using the old map meanwhile.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._negative = OrderedDict()
+        self._loaded_at = None
+        self._refreshing = False
+    
+    def _refresh(self):
+        now = datetime.utcnow()
+        rows = gate_entry_query().filter(
+            Event.date >= now - timedelta(days=2),
+            Event.date <= now + timedelta(days=2)
+        ).all()
+        entries = {row[-1]: GateEntry(*row[:-1]) for row in rows}
+        with self._lock:
+            self._entries = entries
+            self._negative.clear()
+            self._loaded_at = time.monotonic()
+            self._refreshing = False
+    
+    def _refresh_in_background(self):
+        try:
+            with app.app_context():
+                self._refresh()
+        except Exception as e:
+            app.logger.exception(f'Validation index reload failed: {e}')
+            with self._lock:
+                self._refreshing = False
+    
+    def _maybe_refresh(self):
+        with self._lock:
+            stale = (self._loaded_at is None or
+                     time.monotonic() - self._loaded_at > app.config['VALIDATION_INDEX_TTL'])
+            if not stale or self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name='validation-index', daemon=True).start()
+    
+    def lookup(self, qr_code):
+        """Return the GateEntry for a QR code, or None if no such ticket exists"""
+        self._maybe_refresh()
+        with self._lock:
+            entry = self._entries.get(qr_code)
+            if entry is not None and (entry.payment_status == 'paid' or entry.is_used):
+                return entry
+            if entry is None:
+                expires = self._negative.get(qr_code)
+                if expires is not None:
+                    if expires > time.monotonic():
+                        return None
+                    del self._negative[qr_code]
+        
+        row = gate_entry_query().filter(Ticket.qr_code == qr_code).first()
+        with self._lock:
+            if row is None:
+                self._negative[qr_code] = time.monotonic() + app.config['VALIDATION_NEGATIVE_TTL']
+                while len(self._negative) > app.config['VALIDATION_NEGATIVE_SIZE']:
+                    self._negative.popitem(last=False)
+                return None
+            entry = GateEntry(*row[:-1])
+            self._entries[qr_code] = entry
+        return entry
+    
+    def update(self, qr_code, **changes):
+        """Apply a known change (payment settled, ticket used) to a cached entry"""
+        with self._lock:
+            entry = self._entries.get(qr_code)
+            if entry is not None:
+                self._entries[qr_code] = entry._replace(**changes)
+    
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+validation_index = ValidationIndex()
+
+# Denial reason -> (HTTP status, message, gate display text)
+SCAN_DENIALS = {
+    'invalid': (404, 'Invalid QR code', 'ACCESS DENIED\nInvalid Ticket'),
+    'unpaid': (403, 'Ticket not paid', 'ACCESS DENIED\nTicket Not Paid'),
+    'used': (403, 'Ticket already used', 'ACCESS DENIED\nTicket Already Used'),
+    'wrong_date': (403, 'Event date mismatch', 'ACCESS DENIED\nEvent Not Today'),
+    'wrong_event': (403, 'Ticket is for another event', 'ACCESS DENIED\nWrong Event'),
+}
+
+def parse_device_id(data):
+    """Gate-supplied device id, 'unknown' when absent; ValueError unless a short non-empty string"""
+    device_id = data.get('device_id', 'unknown')
+    if not isinstance(device_id, str) or not device_id.strip() or len(device_id) > 50:
+        raise ValueError('device_id must be a non-empty string of at most 50 characters')
+    return device_id
+
+def parse_event_id(value):
+    """Gate-supplied event id as an int, or None when absent; ValueError on anything else"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('event_id must be an integer')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('event_id must be an integer') from None
+
+def signed_scan_denial(qr_code, at, event_id=None):
+    """
+    Pure CPU check of a signed QR payload, run before any lookup.
+    Random-token codes are not signed and always pass here.
+    """
+    if not qr_code.startswith(SIGNED_QR_PREFIX):
+        return None
+    signed = verify_ticket_qr(qr_code)
+    if signed is None:
+        return 'invalid'
+    if event_id is not None and signed.event_id != event_id:
+        return 'wrong_event'
+    if not event_in_entry_window(signed.event_date, at):
+        return 'wrong_date'
+    return None
+
+def scan_denial(ticket, at, event_id=None):
+    """Reason a scan at `at` must be denied before claiming the ticket, or None"""
+    if not ticket:
+        return 'invalid'
+    if event_id is not None and ticket.event_id != event_id:
+        return 'wrong_event'
+    if ticket.payment_status != 'paid':
+        return 'unpaid'
+    if ticket.is_used:
+        return 'used'
+    if not event_in_entry_window(ticket.event_date, at):
+        return 'wrong_date'
+    return None
+
+# Offline gate manifests
+MANIFEST_MAGIC = b'TKM1'
+DELTA_MAGIC = b'TKD1'
+MANIFEST_HEADER = struct.Struct('>4sIQIBI')  # magic, event_id, cursor, generated_at, hash_bytes, count
+DELTA_HEADER = struct.Struct('>4sIQQBBI')  # magic, event_id, from, to, hash_bytes, has_more, count
+DELTA_OPS = {'added': 1, 'used': 2, 'revoked': 3}
+
+_manifest_cache = TTLCache(app.config['MANIFEST_CACHE_SIZE'], app.config['MANIFEST_CACHE_TTL'])
+
+def manifest_hash(qr_code):
+    """Truncated SHA-256 of a QR code, as stored in gate manifests"""
+    return hashlib.sha256(qr_code.encode()).digest()[:app.config['MANIFEST_HASH_BYTES']]
+
+def sign_manifest(body):
+    """Append an HMAC-SHA256 of the body so gates can verify what they cache"""
+    key = app.config['GATE_MANIFEST_KEY'].encode()
+    return body + hmac.new(key, body, hashlib.sha256).digest()
+
+def latest_ticket_change(event_id):
+    return db.session.query(db.func.max(TicketChange.id)).filter(
+        TicketChange.event_id == event_id
+    ).scalar() or 0
+
+def build_manifest(event_id):
+    """
+    Sorted truncated hashes of every paid, unused ticket for an event, signed.
+    The cursor is read first, so changes racing the export are repeated in the
+    next delta rather than lost. Returns (cursor, manifest bytes).
+    """
+    cursor = latest_ticket_change(event_id)
+    cached = _manifest_cache.get(event_id)
+    if cached and cached[0] == cursor:
+        return cached
+    
+    codes = db.session.query(Ticket.qr_code).filter(
+        Ticket.event_id == event_id,
+        Ticket.payment_status == 'paid',
+        Ticket.is_used == False
+    )
+    hashes = sorted({manifest_hash(qr_code) for (qr_code,) in codes})
+    header = MANIFEST_HEADER.pack(MANIFEST_MAGIC, event_id, cursor, int(time.time()),
+                                  app.config['MANIFEST_HASH_BYTES'], len(hashes))
+    manifest = (cursor, sign_manifest(header + b''.join(hashes)))
+    _manifest_cache.set(event_id, manifest)
+    return manifest
+
+def build_manifest_delta(event_id, since):
+    """Signed list of (op, hash) changes for an event after the given cursor"""
+    limit = app.config['MANIFEST_DELTA_LIMIT']
+    changes = (TicketChange.query
+               .filter(TicketChange.event_id == event_id, TicketChange.id > since)
+               .order_by(TicketChange.id)
+               .limit(limit + 1)
+               .all())
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    to_cursor = changes[-1].id if changes else since
+    
+    header = DELTA_HEADER.pack(DELTA_MAGIC, event_id, since, to_cursor,
+                               app.config['MANIFEST_HASH_BYTES'], int(has_more), len(changes))
+    body = b''.join(bytes([DELTA_OPS[change.change]]) + manifest_hash(change.qr_code)
+                    for change in changes)
+    return to_cursor, has_more, sign_manifest(header + body)
+
+# Write-behind entry logging
+class EntryLogWriter:
+    """
+    Buffers gate EntryLog rows in memory and writes them with bulk inserts
+    from a background thread, flushing on batch size or time. The queue is
+    drained at interpreter exit so no scan is lost on a clean shutdown.
+    """
+    
+    MAX_ATTEMPTS = 5
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._retry = []
+        self._stopping = threading.Event()
+        self._wake = threading.Event()  # set when a full batch is waiting
+    
+    def log(self, ticket_pk, status, device_id, entry_time=None):
+        """Record a scan outcome; returns immediately"""
+        self._queue.put({
+            'ticket_id': ticket_pk,
+            'status': status,
+            'device_id': device_id,
+            'entry_time': entry_time or datetime.utcnow()
+        })
+        if self._thread is None:
+            self._start()
+        if self._queue.qsize() >= app.config['ENTRY_LOG_BATCH_SIZE']:
+            self._wake.set()
+    
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='entry-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(app.config['ENTRY_LOG_FLUSH_INTERVAL'])
+            self._wake.clear()
+            self.flush()
+    
+    def _write(self, rows, attempts):
+        try:
+            with app.app_context():
+                db.session.execute(db.insert(EntryLog), rows)
+                db.session.commit()
+        except Exception as e:
+            if attempts + 1 >= self.MAX_ATTEMPTS:
+                app.logger.error(f'Dropping {len(rows)} entry logs after {attempts + 1} attempts: {e}')
+            else:
+                app.logger.warning(f'Entry log flush failed, will retry: {e}')
+                self._retry.append((rows, attempts + 1))
+    
+    def flush(self):
+        """Write everything queued so far"""
+        with self._flush_lock:
+            retry, self._retry = self._retry, []
+            for rows, attempts in retry:
+                self._write(rows, attempts)
+            
+            batch_size = app.config['ENTRY_LOG_BATCH_SIZE']
+            rows = []
+            while True:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if len(rows) >= batch_size:
+                    self._write(rows, 0)
+                    rows = []
+            if rows:
+                self._write(rows, 0)
+    
+    def stop(self):
+        """Stop the writer thread and drain the queue"""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+
+entry_log_writer = EntryLogWriter()
+
+# Device telemetry
+class TelemetryStore:
+    """
+    Device registry and heartbeat store. Heartbeats land in a per-device ring
+    buffer and in per-minute rollup buckets; a background thread writes closed
+    buckets and the latest registry values to the database in batches.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices = OrderedDict()  # device_id -> in-memory state, least recently seen first
+        self._buckets = {}  # (device_id, bucket_start) -> rollup row
+        self._dirty = {}  # device_id -> registry values not yet written
+        self._thread = None
+        self._stopping = threading.Event()
+    
+    def _state(self, device_id):
+        state = self._devices.get(device_id)
+        if state is None:
+            state = self._devices[device_id] = {
+                'heartbeats': deque(maxlen=app.config['TELEMETRY_HISTORY']),
+                'scans': deque(maxlen=1000),
+                'last_seen': None
+            }
+            while len(self._devices) > app.config['TELEMETRY_MAX_DEVICES']:
+                self._devices.popitem(last=False)
+        else:
+            self._devices.move_to_end(device_id)
+        return state
+    
+    def _bucket(self, device_id, now):
+        width = app.config['TELEMETRY_ROLLUP_SECONDS']
+        start = datetime.utcfromtimestamp(int(now.replace(tzinfo=timezone.utc).timestamp()) // width * width)
+        bucket = self._buckets.get((device_id, start))
+        if bucket is None:
+            bucket = self._buckets[(device_id, start)] = {
+                'device_id': device_id, 'bucket_start': start, 'heartbeats': 0, 'scans': 0,
+                'wifi_total': 0, 'wifi_samples': 0, 'wifi_min': None, 'door_open_count': 0
+            }
+        return bucket
+    
+    def record_heartbeat(self, device_id, data):
+        now = datetime.utcnow()
+        beat = {
+            'time': now,
+            'status': data.get('status', 'unknown'),
+            'wifi_strength': data.get('wifi_strength'),
+            'uptime': data.get('uptime'),
+            'door_open': data.get('door_open')
+        }
+        with self._lock:
+            state = self._state(device_id)
+            state['heartbeats'].append(beat)
+            state['last_seen'] = now
+            bucket = self._bucket(device_id, now)
+            bucket['heartbeats'] += 1
+            if isinstance(beat['wifi_strength'], (int, float)):
+                bucket['wifi_total'] += beat['wifi_strength']
+                bucket['wifi_samples'] += 1
+                if bucket['wifi_min'] is None or beat['wifi_strength'] < bucket['wifi_min']:
+                    bucket['wifi_min'] = beat['wifi_strength']
+            if beat['door_open']:
+                bucket['door_open_count'] += 1
+            self._dirty[device_id] = beat
+        if self._thread is None:
+            self._start()
+    
+    def record_scan(self, device_id, count=1):
+        now = datetime.utcnow()
+        with self._lock:
+            state = self._state(device_id)
+            state['scans'].extend([time.monotonic()] * min(count, 1000))
+            state['last_seen'] = now
+            self._bucket(device_id, now)['scans'] += count
+        if self._thread is None:
+            self._start()
+    
+    def snapshot(self):
+        """This worker's view: last heartbeat and scans in the past minute per device"""
+        cutoff = time.monotonic() - 60
+        with self._lock:
+            return {device_id: {
+                'last_seen': state['last_seen'],
+                'last_heartbeat': state['heartbeats'][-1] if state['heartbeats'] else None,
+                'scans_last_minute': sum(1 for scanned in state['scans'] if scanned >= cutoff)
+            } for device_id, state in self._devices.items()}
+    
+    def forget(self, prefix):
+        """Drop everything buffered for devices whose id starts with `prefix`"""
+        with self._lock:
+            for store in (self._devices, self._dirty):
+                for device_id in [device_id for device_id in store if device_id.startswith(prefix)]:
+                    del store[device_id]
+            for key in [key for key in self._buckets if key[0].startswith(prefix)]:
+                del self._buckets[key]
+    
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+    
+    def _run(self):
+        while not self._stopping.wait(app.config['TELEMETRY_FLUSH_INTERVAL']):
+            self.flush()
+    
+    def flush(self, everything=False):
+        """Write closed rollup buckets (all of them if `everything`) and registry updates"""
+        closed_before = datetime.utcnow() - timedelta(seconds=app.config['TELEMETRY_ROLLUP_SECONDS'])
+        with self._lock:
+            keys = [key for key, bucket in self._buckets.items()
+                    if everything or bucket['bucket_start'] <= closed_before]
+            buckets = [self._buckets.pop(key) for key in keys]
+            dirty, self._dirty = self._dirty, {}
+        if not buckets and not dirty:
+            return
+        
+        rollups = [{
+            'device_id': bucket['device_id'],
+            'bucket_start': bucket['bucket_start'],
+            'heartbeats': bucket['heartbeats'],
+            'scans': bucket['scans'],
+            'wifi_avg': bucket['wifi_total'] / bucket['wifi_samples'] if bucket['wifi_samples'] else None,
+            'wifi_min': bucket['wifi_min'],
+            'door_open_count': bucket['door_open_count']
+        } for bucket in buckets]
+        registry = [{
+            'id': device_id,
+            'status': beat['status'],
+            'wifi_strength': beat['wifi_strength'],
+            'uptime': beat['uptime'],
+            'door_open': beat['door_open'],
+            'first_seen': beat['time'],
+            'last_seen': beat['time']
+        } for device_id, beat in dirty.items()]
+        
+        # Rollups and the registry commit separately so one failing never loses the other
+        if rollups:
+            failed = self._write(db.insert(DeviceTelemetry), rollups)
+            if failed:
+                app.logger.warning(f'Dropping {len(failed)} telemetry rollups the database would not take')
+        if registry:
+            failed = self._write(upsert_devices(), registry)
+            if failed:
+                app.logger.warning(f'Registry update for {len(failed)} devices failed, will retry')
+                with self._lock:
+                    for row in failed:
+                        self._dirty.setdefault(row['id'], dirty[row['id']])
+    
+    def _write(self, statement, rows):
+        """
+        One batch, or row by row when the batch fails so a single bad row cannot
+        block the rest. Bad rows are logged and dropped; returns the rows that
+        hit a transient error (a locked database) and are worth retrying.
+        """
+        try:
+            with app.app_context():
+                db.session.execute(statement, rows)
+                db.session.commit()
+            return []
+        except OperationalError:
+            return rows
+        except Exception:
+            pass
+        transient = []
+        for row in rows:
+            try:
+                with app.app_context():
+                    db.session.execute(statement, [row])
+                    db.session.commit()
+            except OperationalError:
+                transient.append(row)
+            except Exception as e:
+                app.logger.warning(f'Dropping telemetry row {row!r}: {e}')
+        return transient
+    
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush(everything=True)
+
+telemetry = TelemetryStore()
+
+def parse_heartbeat(data):
+    """Validated (device_id, heartbeat fields) from a status payload; ValueError on bad input"""
+    device_id = parse_device_id(data)
+    status = data.get('status', 'unknown')
+    if not isinstance(status, str):
+        raise ValueError('status must be a string')
+    fields = {'status': status[:20]}
+    for field in ('wifi_strength', 'uptime'):
+        value = data.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not math.isfinite(value)):
+            raise ValueError(f'{field} must be a number')
+        fields[field] = int(value) if value is not None else None
+    door_open = data.get('door_open')
+    if door_open is not None and not isinstance(door_open, bool):
+        raise ValueError('door_open must be true or false')
+    fields['door_open'] = door_open
+    return device_id, fields
+
+def upsert_devices():
+    """
+    Insert-or-update for registry rows, safe when several workers see a new
+    gate at once; first_seen is kept and an older heartbeat never wins.
+    """
+    stmt = sqlite_insert(Device)
+    return stmt.on_conflict_do_update(
+        index_elements=[Device.id],
+        set_={column: stmt.excluded[column]
+              for column in ('status', 'wifi_strength', 'uptime', 'door_open', 'last_seen')},
+        where=db.or_(Device.last_seen == None, Device.last_seen <= stmt.excluded.last_seen)
+    )
+
+# Live entry activity
+class EntryBroadcaster:
+    """
+    In-process fan-out of scan outcomes to connected admin screens. Each
+    subscriber has a bounded queue; a screen that falls behind loses events
+    rather than slowing the gates, and every event carries running counters.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._counters = Counter()
+    
+    def publish(self, event):
+        with self._lock:
+            self._counters[event['status']] += 1
+            if event.get('reason'):
+                self._counters[event['reason']] += 1
+            if not self._subscribers:
+                return
+            event['counters'] = dict(self._counters)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                pass
+    
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+    
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=app.config['ENTRY_STREAM_QUEUE_SIZE'])
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+entry_broadcaster = EntryBroadcaster()
+
+# Request metrics
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PAYMENT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30)
+
+class MetricsRegistry:
+    """
+    Counters and fixed-bucket histograms rendered in the Prometheus text
+    exposition format. An update is a dict lookup and a few additions under
+    one lock, so it can sit on the scan path.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}  # name -> (type, help, label names, buckets)
+        self._series = {}  # name -> {label values: count or [bucket counts, sum, count]}
+    
+    def counter(self, name, help, labels=()):
+        self._metrics[name] = ('counter', help, labels, None)
+        self._series[name] = {}
+    
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self._metrics[name] = ('histogram', help, labels, buckets)
+        self._series[name] = {}
+    
+    def inc(self, name, labels=(), amount=1):
+        series = self._series[name]
+        with self._lock:
+            series[labels] = series.get(labels, 0) + amount
+    
+    def observe(self, name, labels, value):
+        buckets = self._metrics[name][3]
+        index = bisect.bisect_left(buckets, value)
+        series = self._series[name]
+        with self._lock:
+            values = series.get(labels)
+            if values is None:
+                values = series[labels] = [[0] * (len(buckets) + 1), 0.0, 0]
+            values[0][index] += 1
+            values[1] += value
+            values[2] += 1
+    
+    def render(self):
+        with self._lock:
+            snapshot = {name: {labels: [list(v[0]), v[1], v[2]] if isinstance(v, list) else v
+                               for labels, v in series.items()}
+                        for name, series in self._series.items()}
+        lines = []
+        for name, (kind, help, label_names, buckets) in self._metrics.items():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(snapshot[name].items()):
+                pairs = [f'{key}="{_label_value(val)}"' for key, val in zip(label_names, labels)]
+                if kind == 'counter':
+                    lines.append(f"{name}{_label_set(pairs)} {value}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    bucket_pairs = pairs + [f'le="{bound}"']
+                    lines.append(f'{name}_bucket{_label_set(bucket_pairs)} {cumulative}')
+                lines.append(f'{name}_sum{_label_set(pairs)} {total}')
+                lines.append(f'{name}_count{_label_set(pairs)} {count}')
+        return '\n'.join(lines) + '\n'
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_set(pairs):
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+metrics = MetricsRegistry()
+metrics.histogram('http_request_duration_seconds', 'Time spent handling a request', ('endpoint', 'method'))
+metrics.counter('http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+metrics.histogram('http_request_db_seconds', 'Time spent in SQL per request', ('endpoint',))
+metrics.counter('db_queries_total', 'SQL statements executed while handling requests', ('endpoint',))
+metrics.histogram('payment_duration_seconds', 'Mobile money call latency', ('status',), PAYMENT_BUCKETS)
+metrics.counter('gate_scans_total', 'Gate decisions by device and outcome', ('device_id', 'outcome'))
+metrics.counter('rate_limited_requests_total', 'Device API requests rejected with 429', ('scope',))
+
+_metric_devices = set()
+
+def metric_device_label(device_id):
+    """device_id as a label, folded into 'other' once METRICS_MAX_DEVICES are tracked"""
+    device_id = str(device_id)
+    if device_id in _metric_devices:
+        return device_id
+    if len(_metric_devices) < app.config['METRICS_MAX_DEVICES']:
+        _metric_devices.add(device_id)
+        return device_id
+    return 'other'
+
+@sa_event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@sa_event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    for profile in getattr(_active_profiles, 'stack', ()):
+        profile.record(statement, elapsed)
+    if has_request_context():
+        g.db_time = g.get('db_time', 0.0) + elapsed
+        g.db_queries = g.get('db_queries', 0) + 1
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe('http_request_duration_seconds', (endpoint, request.method), time.perf_counter() - started)
+    metrics.inc('http_requests_total', (endpoint, request.method, str(response.status_code)))
+    metrics.observe('http_request_db_seconds', (endpoint,), g.get('db_time', 0.0))
+    metrics.inc('db_queries_total', (endpoint,), g.get('db_queries', 0))
+    return response
+
+# SQL profiling
+_active_profiles = threading.local()
+
+@lru_cache(maxsize=1024)
+def sql_fingerprint(statement):
+    """Statement shape with literals and expanded IN lists collapsed, so N lookups look alike"""
+    statement = re.sub(r"'(?:[^']|'')*'", '?', statement)
+    statement = re.sub(r'\b\d+(?:\.\d+)?\b', '?', statement)
+    statement = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', statement)
+    return re.sub(r'\s+', ' ', statement).strip()
+
+class QueryProfile:
+    """SQL statements run by the current thread while the profile is active"""
+    
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+    
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.db_time += elapsed
+        self.fingerprints[sql_fingerprint(statement)] += 1
+    
+    def repeated(self, threshold):
+        """(fingerprint, count) for statement shapes run at least `threshold` times"""
+        return [(fingerprint, count) for fingerprint, count in self.fingerprints.most_common()
+                if count >= threshold]
+    
+    def start(self):
+        if not hasattr(_active_profiles, 'stack'):
+            _active_profiles.stack = []
+        _active_profiles.stack.append(self)
+        return self
+    
+    def stop(self):
+        _active_profiles.stack.remove(self)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+@contextmanager
+def query_budget(max_queries):
+    """
+    Assert the block runs at most `max_queries` SQL statements on this thread:
+        with query_budget(3):
+            client.get('/dashboard')
+    """
+    with QueryProfile() as profile:
+        yield profile
+    if profile.count > max_queries:
+        repeated = ''.join(f'\n  {count}x {fingerprint}' for fingerprint, count in profile.repeated(2))
+        raise AssertionError(f'{profile.count} queries, budget is {max_queries}{repeated}')
+
+@app.before_request
+def start_sql_profile():
+    if app.config['SQL_PROFILER']:
+        g.sql_profile = QueryProfile().start()
+
+@app.after_request
+def report_sql_profile(response):
+    profile = g.get('sql_profile')
+    if profile is None:
+        return response
+    response.headers['X-SQL-Queries'] = str(profile.count)
+    response.headers['X-SQL-Time-Ms'] = f'{profile.db_time * 1000:.2f}'
+    for fingerprint, count in profile.repeated(app.config['SQL_PROFILER_REPEAT_THRESHOLD']):
+        app.logger.warning(f'Possible N+1 in {request.endpoint}: {count}x {fingerprint[:300]}')
+    return response
+
+@app.teardown_request
+def stop_sql_profile(exc):
+    profile = g.pop('sql_profile', None)
+    if profile is not None:
+        profile.stop()
+
+# Request profiling
+PROFILE_HEADER = 'X-Profile'  # honoured for signed-in admins only
+_profile_dir_lock = threading.Lock()
+# Python 3.12+ profiles through the interpreter-wide sys.monitoring: one profile at a time per
+# process, and on those versions a profile can include frames from other request threads
+_profiler_busy = threading.Lock()
+
+@app.before_request
+def start_request_profile():
+    """Profile a sampled fraction of requests, or an admin's request that asks for it"""
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    sampled = rate > 0 and random.random() < rate
+    forced = (PROFILE_HEADER in request.headers
+              and current_user.is_authenticated and current_user.is_admin)
+    if not (sampled or forced) or not _profiler_busy.acquire(blocking=False):
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool (a debugger, coverage) holds the interpreter hook
+        _profiler_busy.release()
+        return
+    g.profiler = profiler
+    g.profile_forced = forced
+    g.profile_started = time.perf_counter()
+
+@app.teardown_request
+def stop_request_profile(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    _profiler_busy.release()
+    elapsed_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+    if g.pop('profile_forced') or elapsed_ms >= app.config['PROFILE_THRESHOLD_MS']:
+        try:
+            save_request_profile(profiler, request.endpoint or 'unmatched', elapsed_ms)
+        except OSError as e:
+            app.logger.warning(f'Could not write request profile: {e}')
+
+def save_request_profile(profiler, endpoint, elapsed_ms):
+    """Write <time>-<endpoint>-<ms>ms.prof plus a readable .txt, then trim the directory"""
+    directory = app.config['PROFILE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}-{elapsed_ms:.0f}ms")
+    profiler.dump_stats(f'{stem}.prof')
+    with open(f'{stem}.txt', 'w') as f:
+        pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(40)
+    
+    # Evict whole profiles, oldest first; names sort by time
+    with _profile_dir_lock:
+        sizes = {}
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                sizes.setdefault(os.path.splitext(entry.path)[0], []).append((entry.path, entry.stat().st_size))
+        total = sum(size for files in sizes.values() for _, size in files)
+        for old_stem in sorted(sizes):
+            if total <= app.config['PROFILE_DIR_MAX_BYTES'] or old_stem == stem:
+                break
+            for path, size in sizes[old_stem]:
+                os.remove(path)
+                total -= size
+
+# Device API rate limiting
+class TokenBucketLimiter:
+    """Token buckets per key with O(1) updates and LRU-bounded memory"""
+    
+    def __init__(self, rate, burst, max_keys):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+    
+    def hit(self, key, cost=1):
+        """Take `cost` tokens; returns 0 if allowed, else seconds until it would be"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+rate_limiters = {
+    (scope, kind): TokenBucketLimiter(rate, burst, app.config['RATE_LIMIT_MAX_KEYS'])
+    for scope, limits in app.config['RATE_LIMITS'].items()
+    for kind, (rate, burst) in limits.items()
+}
+
+def rate_limit(scope):
+    """Reject with 429 and Retry-After once a device or client IP exceeds its bucket"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            data = request.get_json(silent=True)
+            try:
+                device_id = parse_device_id(data) if isinstance(data, dict) else 'unknown'
+            except ValueError as e:
+                return jsonify({'status': 'error', 'message': str(e), 'access_granted': False}), 400
+            wait = rate_limiters[(scope, 'device')].hit(device_id)
+            # Optional: gates behind one NAT share an IP, see TRUSTED_PROXY_HOPS for proxies
+            if (scope, 'ip') in rate_limiters:
+                wait = max(wait, rate_limiters[(scope, 'ip')].hit(request.remote_addr))
+            if wait:
+                metrics.inc('rate_limited_requests_total', (scope,))
+                response = jsonify({
+                    'status': 'error',
+                    'message': 'Too many requests',
+                    'access_granted': False
+                })
+                response.headers['Retry-After'] = str(math.ceil(wait))
+                return response, 429
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+recent_scans = TTLCache(app.config['RATE_LIMIT_MAX_KEYS'], app.config['SCAN_DEDUP_WINDOW'])
+
+def collapse_repeated_scans(f):
+    """
+    Answer a repeat of the same QR code from the same device with the first
+    decision, marked "duplicate": true. A repeated grant comes back with
+    access_granted false so the gate does not open a second time.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('qr_code'), str):
+            return f(*args, **kwargs)
+        try:
+            key = (parse_device_id(data), data['qr_code'], parse_event_id(data.get('event_id')))
+        except ValueError:
+            return f(*args, **kwargs)  # the view answers 400
+        cached = recent_scans.get(key)
+        if cached is None:
+            response = app.make_response(f(*args, **kwargs))
+            if recent_scans.get(key) is None:
+                recent_scans.set(key, (response.get_json(silent=True), response.status_code))
+            return response
+        
+        decision, status_code = cached
+        if not isinstance(decision, dict):
+            return f(*args, **kwargs)
+        replay = dict(decision, duplicate=True)
+        if decision.get('access_granted'):
+            replay.update(access_granted=False, message='Duplicate scan, already admitted',
+                          display_message='ALREADY ADMITTED')
+        return jsonify(replay), status_code
+    return decorated_function
+
+# Routes
+# Public event catalog
+catalog_cache = TTLCache(app.config['CATALOG_CACHE_SIZE'], app.config['CATALOG_CACHE_TTL'])
+
+def load_catalog_page(upcoming, cursor):
+    """Active events by date as plain dicts, safe to share between requests"""
+    query = read_session.query(Event).filter_by(is_active=True)
+    if upcoming:
+        query = query.filter(Event.date >= datetime.utcnow())
+    events, next_cursor = keyset_page(query, (Event.date, Event.id), cursor,
+                                      app.config['CATALOG_PAGE_SIZE'], descending=False)
+    events = [{
+        'id': event.id,
+        'name': event.name,
+        'description': event.description,
+        'price': event.price,
+        'date': event.date,
+        'location': event.location,
+        'max_capacity': event.max_capacity
+    } for event in events]
+    return events, next_cursor
+
+def invalidate_catalog():
+    """Drop this worker's cached catalog; other workers catch up within CATALOG_CACHE_TTL"""
+    catalog_cache.clear()
+
 # Routes
 @app.route('/')
 def index():
-    events = Event.query.filter_by(is_active=True).all()
-    return render_template('index.html', events=events)
+    """Event catalog; ?upcoming=1 hides past events, ?format=json for API clients"""
+    upcoming = request.args.get('upcoming') == '1'
+    cursor = request.args.get('cursor')
+    wants_json = request.args.get('format') == 'json'
+    
+    # Anonymous pages and JSON do not depend on the session, so the whole response is cached
+    shared = wants_json or (not current_user.is_authenticated and '_flashes' not in session)
+    response_key = ('json' if wants_json else 'html', upcoming, cursor)
+    cached = catalog_cache.get(response_key) if shared else None
+    
+    if cached is None:
+        page = catalog_cache.get(('page', upcoming, cursor))
+        if page is None:
+            page = load_catalog_page(upcoming, cursor)
+            catalog_cache.set(('page', upcoming, cursor), page)
+        events, next_cursor = page
+        
+        if not shared:
+            return render_template('index.html', events=events, upcoming=upcoming, next_cursor=next_cursor)
+        
+        if wants_json:
+            body = json.dumps({
+                'events': [dict(event, date=event['date'].isoformat()) for event in events],
+                'next_cursor': next_cursor
+            })
+            mimetype = 'application/json'
+        else:
+            body = render_template('index.html', events=events, upcoming=upcoming, next_cursor=next_cursor)
+            mimetype = 'text/html'
+        cached = (hashlib.sha1(body.encode()).hexdigest(), body, mimetype)
+        catalog_cache.set(response_key, cached)
+    
+    etag, body, mimetype = cached
+    response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -180,6 +1771,8 @@ def login():
         
         if user and check_password_hash(user.password_hash, password):
             login_user(user)
+            # Fresh from the database, so the next request needs no lookup
+            user_cache.set(user.id, UserIdentity(user.id, user.username, user.phone, user.is_admin))
             if request.is_json:
                 return jsonify({'message': 'Login successful', 'user_id': user.id}), 200
             return redirect(url_for('dashboard'))
@@ -199,8 +1792,47 @@ def logout():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    tickets = Ticket.query.filter_by(user_id=current_user.id).order_by(Ticket.purchase_date.desc()).all()
-    return render_template('dashboard.html', tickets=tickets)
+    """
+    The user's tickets, upcoming events first (soonest first), then past events
+    (most recent first). The cursor is prefixed with the phase it resumes in.
+    """
+    per_page = app.config['DASHBOARD_PAGE_SIZE']
+    now = datetime.utcnow()
+    tickets_query = (Ticket.query
+                     .filter(Ticket.user_id == current_user.id)
+                     .join(Ticket.event)
+                     .options(db.contains_eager(Ticket.event)))
+    ticket_key = lambda ticket: (ticket.event.date, ticket.id)
+    
+    phase, _, cursor = request.args.get('cursor', 'upcoming:').partition(':')
+    tickets, next_cursor = [], None
+    if phase == 'upcoming':
+        tickets, next_cursor = keyset_page(tickets_query.filter(Event.date >= now), (Event.date, Ticket.id),
+                                           cursor, per_page, descending=False, key=ticket_key)
+        if next_cursor:
+            next_cursor = f'upcoming:{next_cursor}'
+        phase, cursor = 'past', None
+    if phase == 'past' and len(tickets) < per_page:
+        past, next_cursor = keyset_page(tickets_query.filter(Event.date < now), (Event.date, Ticket.id),
+                                        cursor, per_page - len(tickets), key=ticket_key)
+        tickets += past
+        if next_cursor:
+            next_cursor = f'past:{next_cursor}'
+    elif phase == 'past' and not next_cursor:
+        # Upcoming filled the page exactly; continue with past tickets if there are any
+        if db.session.query(tickets_query.filter(Event.date < now).exists()).scalar():
+            next_cursor = 'past:'
+    
+    paid = Ticket.payment_status == 'paid'
+    totals = db.session.query(
+        db.func.count(Ticket.id),
+        db.func.sum(db.case((paid, 1), else_=0)),
+        db.func.sum(db.case((Ticket.payment_status == 'pending', 1), else_=0)),
+        db.func.sum(db.case((Ticket.is_used == True, 1), else_=0))
+    ).filter(Ticket.user_id == current_user.id).one()
+    counts = dict(zip(('total', 'paid', 'pending', 'used'), (value or 0 for value in totals)))
+    
+    return render_template('dashboard.html', tickets=tickets, counts=counts, next_cursor=next_cursor)
 
 @app.route('/purchase/<int:event_id>', methods=['GET', 'POST'])
 @login_required
@@ -208,185 +1840,307 @@ def purchase_ticket(event_id):
     event = Event.query.get_or_404(event_id)
     
     if request.method == 'POST':
-        # Check if event is still available
-        current_tickets = Ticket.query.filter_by(event_id=event_id, payment_status='paid').count()
-        if current_tickets >= event.max_capacity:
+        # Create ticket with pending payment
+        qr_data = secrets.token_urlsafe(32)
+        
+        # Hold a seat; the conditional update never lets reservations exceed capacity
+        if not reserve_ticket(event_id):
+            db.session.rollback()
             if request.is_json:
                 return jsonify({'error': 'Event is sold out'}), 400
             flash('Event is sold out')
             return redirect(url_for('index'))
         
-        # Create ticket with pending payment
-        qr_data = secrets.token_urlsafe(32)
-        qr_image = generate_qr_code(qr_data)
-        
         ticket = Ticket(
             user_id=current_user.id,
             event_id=event_id,
             qr_code=qr_data,
-            qr_image_data=qr_image,
             payment_status='pending'
         )
         
         db.session.add(ticket)
+        if app.config['SIGNED_QR_CODES']:
+            db.session.flush()
+            ticket.qr_code = sign_ticket_qr(ticket.id, event.id, event.date)
+        # Read before the commit expires them, saving a reload of the user and the event
+        phone, price = current_user.phone, event.price
         db.session.commit()
         
-        # Process mobile payment
+        # Hand the mobile payment to the background pool
         payment_ref = f'TKT{ticket.id}{secrets.token_hex(4).upper()}'
-        payment_result = process_mobile_payment(current_user.phone, event.price, payment_ref)
-        
-        if payment_result['status'] == 'success':
-            ticket.payment_status = 'paid'
-            ticket.payment_reference = payment_result['transaction_id']
-            db.session.commit()
-            
-            if request.is_json:
-                return jsonify({
-                    'message': 'Ticket purchased successfully',
-                    'ticket_id': ticket.ticket_id,
-                    'qr_code': qr_data
-                }), 200
-            
-            flash('Ticket purchased successfully!')
-            return redirect(url_for('dashboard'))
-        else:
+        if not submit_payment(ticket.id, phone, price, payment_ref):
             ticket.payment_status = 'failed'
+            release_reservation(event_id, sold=False)
             db.session.commit()
             
             if request.is_json:
-                return jsonify({'error': payment_result['message']}), 400
+                response = jsonify({'error': 'Payment service busy, please retry'})
+                response.headers['Retry-After'] = '5'
+                return response, 503
             
-            flash(f'Payment failed: {payment_result["message"]}')
-            return redirect(url_for('index'))
+            flash('Payment service is busy, please try again shortly')
+            return redirect(url_for('purchase_ticket', event_id=event_id))
+        
+        status_url = url_for('ticket_status', ticket_id=ticket.ticket_id)
+        
+        if request.is_json:
+            response = jsonify({
+                'message': 'Payment processing',
+                'ticket_id': ticket.ticket_id,
+                'payment_status': ticket.payment_status,
+                'status_url': status_url
+            })
+            response.headers['Location'] = status_url
+            return response, 202
+        
+        flash('Payment request sent to your phone. Your ticket will be ready once it is confirmed.')
+        return redirect(url_for('view_ticket', ticket_id=ticket.ticket_id))
     
     return render_template('purchase.html', event=event)
 
 # ESP32 API Endpoints
+def record_scan_outcome(ticket, device_id, reason, entry_time=None):
+    """Queue the EntryLog row and push the outcome to live admin screens"""
+    entry_time = entry_time or datetime.utcnow()
+    status = 'denied' if reason else 'granted'
+    metrics.inc('gate_scans_total', (metric_device_label(device_id), reason or 'granted'))
+    entry_log_writer.log(ticket.id if ticket else None, status, device_id, entry_time)
+    entry_broadcaster.publish({
+        'time': entry_time.isoformat(),
+        'status': status,
+        'reason': reason,
+        'device_id': device_id,
+        'ticket_id': ticket.ticket_id if ticket else None,
+        'user_name': ticket.holder_name if ticket else None,
+        'event_name': ticket.event_name if ticket else None
+    })
+
+def deny_scan(ticket, device_id, reason):
+    """Log a denied scan and build the gate response for it"""
+    record_scan_outcome(ticket, device_id, reason)
+    status_code, message, display_message = SCAN_DENIALS[reason]
+    return jsonify({
+        'status': 'error',
+        'message': message,
+        'access_granted': False,
+        'display_message': display_message
+    }), status_code
+
 @app.route('/api/validate_qr', methods=['POST'])
+@rate_limit('scan')
+@collapse_repeated_scans
 def validate_qr():
     """
     API endpoint for ESP32 to validate QR codes
     Expected payload: {"qr_code": "qr_code_data", "device_id": "esp32_device_id"}
+    Optional "event_id" makes the gate reject tickets for other events.
     """
     data = request.get_json()
     
-    if not data or 'qr_code' not in data:
+    if not isinstance(data, dict) or 'qr_code' not in data:
         return jsonify({
             'status': 'error',
             'message': 'QR code is required',
             'access_granted': False
         }), 400
+    if not isinstance(data['qr_code'], str):
+        return jsonify({
+            'status': 'error',
+            'message': 'QR code must be a string',
+            'access_granted': False
+        }), 400
+    
+    try:
+        device_id = parse_device_id(data)
+        event_id = parse_event_id(data.get('event_id'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e), 'access_granted': False}), 400
     
     qr_code = data['qr_code']
-    device_id = data.get('device_id', 'unknown')
+    now = datetime.utcnow()
+    telemetry.record_scan(device_id)
     
-    # Find ticket by QR code
-    ticket = Ticket.query.filter_by(qr_code=qr_code).first()
+    # Forged or wrong-event signed codes are rejected without touching the database
+    reason = signed_scan_denial(qr_code, now, event_id)
+    if reason:
+        return deny_scan(None, device_id, reason)
     
-    if not ticket:
-        # Log failed entry attempt
-        entry_log = EntryLog(
-            ticket_id=None,
-            status='denied',
-            device_id=device_id
-        )
-        db.session.add(entry_log)
-        db.session.commit()
-        
-        return jsonify({
-            'status': 'error',
-            'message': 'Invalid QR code',
-            'access_granted': False,
-            'display_message': 'ACCESS DENIED\nInvalid Ticket'
-        }), 404
+    # Find ticket by QR code and run the paid / unused / event-today checks
+    ticket = validation_index.lookup(qr_code)
+    reason = scan_denial(ticket, now, event_id)
+    if reason:
+        return deny_scan(ticket, device_id, reason)
     
-    # Check if ticket is paid
-    if ticket.payment_status != 'paid':
-        entry_log = EntryLog(
-            ticket_id=ticket.id,
-            status='denied',
-            device_id=device_id
-        )
-        db.session.add(entry_log)
-        db.session.commit()
-        
-        return jsonify({
-            'status': 'error',
-            'message': 'Ticket not paid',
-            'access_granted': False,
-            'display_message': 'ACCESS DENIED\nTicket Not Paid'
-        }), 403
+    # All checks passed - claim the ticket; only one worker can flip is_used
+    claimed = db.session.execute(
+        db.update(Ticket)
+        .where(Ticket.id == ticket.id, Ticket.is_used == False)
+        .values(is_used=True, used_date=now)
+    ).rowcount == 1
     
-    # Check if ticket is already used
-    if ticket.is_used:
-        entry_log = EntryLog(
-            ticket_id=ticket.id,
-            status='denied',
-            device_id=device_id
-        )
-        db.session.add(entry_log)
-        db.session.commit()
-        
-        return jsonify({
-            'status': 'error',
-            'message': 'Ticket already used',
-            'access_granted': False,
-            'display_message': 'ACCESS DENIED\nTicket Already Used'
-        }), 403
+    if not claimed:
+        db.session.rollback()
+        validation_index.update(qr_code, is_used=True)
+        return deny_scan(ticket, device_id, 'used')
     
-    # Check if event is today (within 24 hours)
-    event_date = ticket.event.date
-    now = datetime.utcnow()
-    if abs((event_date - now).days) > 1:
-        entry_log = EntryLog(
-            ticket_id=ticket.id,
-            status='denied',
-            device_id=device_id
-        )
-        db.session.add(entry_log)
-        db.session.commit()
-        
-        return jsonify({
-            'status': 'error',
-            'message': 'Event date mismatch',
-            'access_granted': False,
-            'display_message': 'ACCESS DENIED\nEvent Not Today'
-        }), 403
-    
-    # All checks passed - grant access
-    ticket.is_used = True
-    ticket.used_date = datetime.utcnow()
-    
-    entry_log = EntryLog(
-        ticket_id=ticket.id,
-        status='granted',
-        device_id=device_id
-    )
-    
-    db.session.add(entry_log)
+    db.session.add(TicketChange(event_id=ticket.event_id, qr_code=qr_code, change='used'))
+    record_entries({ticket.event_id: 1})
     db.session.commit()
+    validation_index.update(qr_code, is_used=True)
+    record_scan_outcome(ticket, device_id, None, now)
     
     return jsonify({
         'status': 'success',
         'message': 'Access granted',
         'access_granted': True,
-        'display_message': f'ACCESS GRANTED\nWelcome {ticket.user.username}',
-        'user_name': ticket.user.username,
-        'event_name': ticket.event.name,
+        'display_message': f'ACCESS GRANTED\nWelcome {ticket.holder_name}',
+        'user_name': ticket.holder_name,
+        'event_name': ticket.event_name,
         'ticket_id': ticket.ticket_id
     }), 200
 
+def parse_scan_time(value):
+    """Device timestamp as naive UTC; accepts epoch seconds or ISO 8601, None for now"""
+    if value is None:
+        return datetime.utcnow()
+    if isinstance(value, bool):
+        raise ValueError(f'scanned_at must be a timestamp, got {value!r}')
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.utcfromtimestamp(value)
+        except (OverflowError, OSError):
+            raise ValueError(f'scanned_at out of range: {value!r}') from None
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@app.route('/api/validate_qr_batch', methods=['POST'])
+@rate_limit('scan')
+def validate_qr_batch():
+    """
+    API endpoint for ESP32 gates replaying scans buffered while offline
+    Expected payload: {"device_id": "esp32_device_id", "event_id": optional,
+                       "scans": [{"qr_code": "...", "scanned_at": "ISO 8601 or epoch"}, ...]}
+    The earliest scan of a ticket wins; results come back in request order.
+    """
+    data = request.get_json()
+    scans = data.get('scans') if isinstance(data, dict) else None
+    
+    if not isinstance(scans, list) or not scans:
+        return jsonify({'status': 'error', 'message': 'scans array is required'}), 400
+    if len(scans) > app.config['SCAN_BATCH_LIMIT']:
+        return jsonify({
+            'status': 'error',
+            'message': f"At most {app.config['SCAN_BATCH_LIMIT']} scans per batch"
+        }), 413
+    
+    try:
+        device_id = parse_device_id(data)
+        event_id = parse_event_id(data.get('event_id'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    try:
+        parsed = [(scan['qr_code'], parse_scan_time(scan.get('scanned_at'))) for scan in scans]
+        for qr_code, _ in parsed:
+            if not isinstance(qr_code, str):
+                raise TypeError(f'qr_code must be a string, got {qr_code!r}')
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': f'Invalid scan: {e}'}), 400
+    telemetry.record_scan(device_id, len(parsed))
+    
+    # Signed codes that fail verification never reach the database
+    reasons = [signed_scan_denial(qr_code, scanned_at, event_id) for qr_code, scanned_at in parsed]
+    
+    # One IN-query resolves every remaining distinct code in the batch
+    codes = {qr_code for (qr_code, _), reason in zip(parsed, reasons) if reason is None}
+    tickets = {row[-1]: GateEntry(*row[:-1])
+               for row in gate_entry_query().filter(Ticket.qr_code.in_(codes))}
+    
+    # Walk scans in device time order so the first scan of a ticket is the one that counts
+    winners = {}
+    for index in sorted(range(len(parsed)), key=lambda i: parsed[i][1]):
+        if reasons[index]:
+            continue
+        qr_code, scanned_at = parsed[index]
+        ticket = tickets.get(qr_code)
+        reasons[index] = scan_denial(ticket, scanned_at, event_id)
+        if reasons[index] is None:
+            if qr_code in winners:
+                reasons[index] = 'used'
+            else:
+                winners[qr_code] = index
+    
+    # Claim all winners at once; tickets another gate used meanwhile are not returned
+    claimed = set()
+    if winners:
+        used_dates = {tickets[qr_code].id: parsed[index][1] for qr_code, index in winners.items()}
+        claimed = set(db.session.execute(
+            db.update(Ticket)
+            .where(Ticket.id.in_(used_dates), Ticket.is_used == False)
+            .values(is_used=True, used_date=db.case(used_dates, value=Ticket.id))
+            .returning(Ticket.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        if claimed:
+            admitted = [qr_code for qr_code in winners if tickets[qr_code].id in claimed]
+            db.session.execute(db.insert(TicketChange), [
+                {'event_id': tickets[qr_code].event_id, 'qr_code': qr_code, 'change': 'used'}
+                for qr_code in admitted
+            ])
+            record_entries(Counter(tickets[qr_code].event_id for qr_code in admitted))
+        db.session.commit()
+        for qr_code in winners:
+            validation_index.update(qr_code, is_used=True)
+    
+    results = []
+    for index, (qr_code, scanned_at) in enumerate(parsed):
+        ticket = tickets.get(qr_code)
+        reason = reasons[index]
+        if reason is None and ticket.id not in claimed:
+            reason = 'used'
+        record_scan_outcome(ticket, device_id, reason, scanned_at)
+        if reason:
+            results.append({
+                'qr_code': qr_code,
+                'access_granted': False,
+                'reason': reason,
+                'message': SCAN_DENIALS[reason][1]
+            })
+        else:
+            results.append({
+                'qr_code': qr_code,
+                'access_granted': True,
+                'message': 'Access granted',
+                'ticket_id': ticket.ticket_id,
+                'user_name': ticket.holder_name
+            })
+    
+    return jsonify({
+        'status': 'success',
+        'processed': len(results),
+        'granted': sum(result['access_granted'] for result in results),
+        'results': results
+    }), 200
+
 @app.route('/api/device_status', methods=['POST'])
+@rate_limit('status')
 def device_status():
     """
     API endpoint for ESP32 to report its status
+    Expected payload: {"device_id": "...", "status": "online", "wifi_strength": -45,
+                       "uptime": 12345, "door_open": false}
     """
-    data = request.get_json()
-    device_id = data.get('device_id', 'unknown')
-    status = data.get('status', 'unknown')
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'JSON object expected'}), 400
+    try:
+        device_id, heartbeat = parse_heartbeat(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     
-    # Log device status (you might want to create a DeviceStatus model)
-    print(f"Device {device_id} status: {status}")
+    # Buffered in memory; rollups and the registry are written in batches
+    telemetry.record_heartbeat(device_id, heartbeat)
     
     return jsonify({
         'status': 'success',
@@ -394,25 +2148,105 @@ def device_status():
         'server_time': datetime.utcnow().isoformat()
     }), 200
 
+@app.route('/api/events/<int:event_id>/manifest')
+def event_manifest(event_id):
+    """
+    Offline validation manifest for ESP32 gates
+    Layout (big-endian): 'TKM1', event_id u32, cursor u64, generated_at u32,
+    hash_bytes u8, count u32, count sorted truncated SHA-256 hashes of valid
+    QR codes, then a 32-byte HMAC-SHA256 over everything before it.
+    """
+    Event.query.get_or_404(event_id)
+    cursor, manifest = build_manifest(event_id)
+    
+    etag = f'{event_id}-{cursor}'
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(manifest, mimetype='application/octet-stream')
+    response.set_etag(etag)
+    response.headers['X-Manifest-Cursor'] = str(cursor)
+    return response
+
+@app.route('/api/events/<int:event_id>/manifest/delta')
+def event_manifest_delta(event_id):
+    """
+    Ticket changes since a manifest cursor: /api/events/<id>/manifest/delta?cursor=N
+    Layout (big-endian): 'TKD1', event_id u32, from u64, to u64, hash_bytes u8,
+    has_more u8, count u32, count entries of op u8 (1 added, 2 used, 3 revoked)
+    plus hash, then a 32-byte HMAC-SHA256. Poll again from `to` while has_more.
+    """
+    Event.query.get_or_404(event_id)
+    since = request.args.get('cursor', 0, type=int)
+    to_cursor, has_more, delta = build_manifest_delta(event_id, since)
+    
+    response = app.response_class(delta, mimetype='application/octet-stream')
+    response.headers['X-Manifest-Cursor'] = str(to_cursor)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Counters and histograms for this worker in Prometheus text format"""
+    token = app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # Admin Routes
 @app.route('/admin')
 @login_required
 @admin_required
 def admin_dashboard():
-    total_tickets = Ticket.query.count()
-    paid_tickets = Ticket.query.filter_by(payment_status='paid').count()
-    used_tickets = Ticket.query.filter_by(is_used=True).count()
-    recent_entries = EntryLog.query.order_by(EntryLog.entry_time.desc()).limit(10).all()
+    # Totals come from the per-event counters kept on Event, not from the tickets
+    totals = read_session.query(
+        db.select(db.func.count(Ticket.id)).scalar_subquery(),
+        db.func.coalesce(db.func.sum(Event.sold_count), 0),
+        db.func.coalesce(db.func.sum(Event.used_count), 0),
+        db.func.coalesce(db.func.sum(Event.revenue), 0)
+    ).one()
+    recent_entries = (read_session.query(EntryLog)
+                      .options(db.joinedload(EntryLog.ticket).joinedload(Ticket.user),
+                               db.joinedload(EntryLog.ticket).joinedload(Ticket.event))
+                      .order_by(EntryLog.entry_time.desc())
+                      .limit(10)
+                      .all())
     
     stats = {
-        'total_tickets': total_tickets,
-        'paid_tickets': paid_tickets,
-        'used_tickets': used_tickets,
-        'revenue': sum(ticket.event.price for ticket in Ticket.query.filter_by(payment_status='paid').all())
+        'total_tickets': totals[0],
+        'paid_tickets': totals[1],
+        'used_tickets': totals[2],
+        'revenue': totals[3]
     }
     
     return render_template('admin_dashboard.html', stats=stats, recent_entries=recent_entries)
 
+@app.route('/admin/entries/stream')
+@login_required
+@admin_required
+def entry_stream():
+    """Server-sent events: every gate decision made by this worker, as it happens"""
+    keepalive = app.config['ENTRY_STREAM_KEEPALIVE']
+    subscriber = entry_broadcaster.subscribe()
+    
+    def generate():
+        try:
+            yield f"event: counters\ndata: {json.dumps(entry_broadcaster.counters())}\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            entry_broadcaster.unsubscribe(subscriber)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/admin/events', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -431,21 +2265,236 @@ def manage_events():
         
         db.session.add(event)
         db.session.commit()
+        invalidate_catalog()
         
         if request.is_json:
             return jsonify({'message': 'Event created successfully'}), 201
         
         flash('Event created successfully')
     
-    events = Event.query.order_by(Event.date.desc()).all()
-    return render_template('manage_events.html', events=events)
+    # Sold/used come from the counters on Event, so the page never touches tickets
+    events, next_cursor = keyset_page(read_session.query(Event), (Event.date, Event.id),
+                                      request.args.get('cursor'), app.config['ADMIN_PAGE_SIZE'])
+    return render_template('manage_events.html', events=events, next_cursor=next_cursor)
 
 @app.route('/admin/users')
 @login_required
 @admin_required
 def manage_users():
-    users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('manage_users.html', users=users)
+    """Newest users first; ?q= prefix-searches username, email and phone, ?format=json for tools"""
+    search = request.args.get('q', '').strip()
+    ticket_count = (db.select(db.func.count(Ticket.id))
+                    .where(Ticket.user_id == User.id)
+                    .correlate(User)
+                    .scalar_subquery())
+    query = read_session.query(User).options(db.with_expression(User.ticket_count, ticket_count))
+    if search:
+        query = query.filter(db.or_(
+            prefix_match(User.username, search),
+            prefix_match(User.email, search),
+            prefix_match(User.phone, search)
+        ))
+    users, next_cursor = keyset_page(query, (User.created_at, User.id),
+                                     request.args.get('cursor'), app.config['ADMIN_PAGE_SIZE'])
+    
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'users': [{
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'phone': user.phone,
+                'is_admin': user.is_admin,
+                'created_at': user.created_at.isoformat(),
+                'ticket_count': user.ticket_count
+            } for user in users],
+            'next_cursor': next_cursor
+        }), 200
+    
+    return render_template('manage_users.html', users=users, search=search, next_cursor=next_cursor)
+
+@app.route('/admin/devices')
+@login_required
+@admin_required
+def device_overview():
+    """Gate registry with last-seen, signal and scan rate per device"""
+    window = timedelta(minutes=5)
+    devices = Device.query.order_by(Device.id).all()
+    scans = dict(db.session.query(DeviceTelemetry.device_id, db.func.sum(DeviceTelemetry.scans))
+                 .filter(DeviceTelemetry.bucket_start >= datetime.utcnow() - window)
+                 .group_by(DeviceTelemetry.device_id)
+                 .all())
+    local = telemetry.snapshot()
+    
+    overview = {}
+    for device in devices:
+        overview[device.id] = {
+            'device_id': device.id,
+            'status': device.status,
+            'wifi_strength': device.wifi_strength,
+            'uptime': device.uptime,
+            'door_open': device.door_open,
+            'first_seen': device.first_seen.isoformat() if device.first_seen else None,
+            'last_seen': device.last_seen,
+            'scans_per_minute': round((scans.get(device.id) or 0) / window.total_seconds() * 60, 1)
+        }
+    # Heartbeats this worker has not flushed yet are newer than the registry
+    for device_id, state in local.items():
+        entry = overview.setdefault(device_id, {'device_id': device_id, 'first_seen': None,
+                                                'last_seen': None, 'scans_per_minute': 0.0})
+        beat = state['last_heartbeat']
+        if beat and (entry['last_seen'] is None or beat['time'] >= entry['last_seen']):
+            entry.update({key: beat[key] for key in ('status', 'wifi_strength', 'uptime', 'door_open')})
+        if state['last_seen'] and (entry['last_seen'] is None or state['last_seen'] > entry['last_seen']):
+            entry['last_seen'] = state['last_seen']
+        entry['scans_last_minute'] = state['scans_last_minute']
+    
+    for entry in overview.values():
+        if entry['last_seen']:
+            entry['last_seen'] = entry['last_seen'].isoformat()
+    return jsonify({'devices': sorted(overview.values(), key=lambda entry: entry['device_id'])}), 200
+
+@app.route('/admin/tickets/bulk_issue', methods=['POST'])
+@login_required
+@admin_required
+def bulk_issue_tickets():
+    """
+    Issue complimentary tickets in bulk
+    Expected payload: {"event_id": 1, "usernames": [...] or "user_ids": [...], "count": 1}
+    """
+    data = request.get_json()
+    if not isinstance(data, dict) or 'event_id' not in data:
+        return jsonify({'error': 'event_id is required'}), 400
+    
+    # JSON clients send ids as numbers or numeric strings; anything else is a 400
+    try:
+        event_id = int(data['event_id'])
+        count = int(data.get('count', 1))
+        user_ids = data.get('user_ids') or []
+        usernames = data.get('usernames') or []
+        if not isinstance(user_ids, list):
+            raise TypeError('user_ids must be a list')
+        user_ids = [int(user_id) for user_id in user_ids]
+        if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+            raise TypeError('usernames must be a list of strings')
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid request: {e}'}), 400
+    
+    event = db.session.get(Event, event_id)
+    if not event:
+        return jsonify({'error': 'Event not found'}), 404
+    
+    if count < 1:
+        return jsonify({'error': 'count must be at least 1'}), 400
+    
+    if user_ids:
+        users = User.query.filter(User.id.in_(user_ids)).all()
+        missing = set(user_ids) - {user.id for user in users}
+    else:
+        users = User.query.filter(User.username.in_(usernames)).all()
+        missing = set(usernames) - {user.username for user in users}
+    if missing or not users:
+        return jsonify({'error': 'Unknown users', 'missing': sorted(missing, key=str)}), 400
+    
+    try:
+        tickets, elapsed = issue_complimentary_tickets(event, users, count)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'message': 'Tickets issued successfully',
+        'issued': len(tickets),
+        'seconds': round(elapsed, 3),
+        'tickets_per_second': round(len(tickets) / elapsed, 1) if elapsed else None,
+        'tickets': [{'ticket_id': t['ticket_id'], 'qr_code': t['qr_code'], 'user_id': t['user_id']}
+                    for t in tickets]
+    }), 201
+
+# Load test fixtures (api_test.py load): an inactive event whose gates all use this prefix
+LOAD_TEST_DEVICE_PREFIX = 'LOADGATE_'
+
+@app.route('/admin/loadtest', methods=['POST'])
+@login_required
+@admin_required
+def seed_load_test():
+    """
+    Create an inactive event happening now with paid and unpaid tickets
+    Expected payload: {"paid": 2000, "unpaid": 100}
+    """
+    data = request.get_json(silent=True)
+    try:
+        paid, unpaid = int(data['paid']), int(data.get('unpaid', 0))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'paid and unpaid ticket counts are required'}), 400
+    if paid < 1 or unpaid < 0:
+        return jsonify({'error': 'paid must be at least 1 and unpaid at least 0'}), 400
+    
+    username = f'loadtest_{secrets.token_hex(4)}'
+    user = User(username=username, email=f'{username}@example.com', phone='+250788000001',
+                password_hash=generate_password_hash(secrets.token_hex(8)))
+    # Inactive keeps it out of the public catalog; gates do not check the flag
+    event = Event(name=f'Load Test {datetime.utcnow():%Y-%m-%d %H:%M}', description='Load test event',
+                  price=1000, date=datetime.utcnow() + timedelta(hours=1), location='Load Test Venue',
+                  max_capacity=paid + unpaid, is_active=False, reserved_count=unpaid)
+    db.session.add_all([user, event])
+    db.session.commit()
+    
+    tickets, _ = issue_complimentary_tickets(event, [user], paid)
+    unpaid_codes = [secrets.token_urlsafe(32) for _ in range(unpaid)]
+    if unpaid_codes:
+        db.session.execute(db.insert(Ticket), [
+            {'qr_code': qr_code, 'user_id': user.id, 'event_id': event.id, 'payment_status': 'pending'}
+            for qr_code in unpaid_codes
+        ])
+        db.session.commit()
+    
+    return jsonify({
+        'event_id': event.id,
+        'user_id': user.id,
+        'paid': [ticket['qr_code'] for ticket in tickets],
+        'unpaid': unpaid_codes,
+        'device_prefix': LOAD_TEST_DEVICE_PREFIX,
+        'rate_limits': app.config['RATE_LIMITS']
+    }), 201
+
+@app.route('/admin/loadtest/purge', methods=['POST'])
+@login_required
+@admin_required
+def purge_load_test():
+    """
+    Delete a seeded load test plus the scans and gates it produced, including
+    what this worker still buffers. Other workers' buffers are written within
+    TELEMETRY_ROLLUP_SECONDS + TELEMETRY_FLUSH_INTERVAL; purge again after that.
+    Expected payload: {"event_id": 1, "user_id": 2}
+    """
+    data = request.get_json(silent=True)
+    try:
+        event_id, user_id = int(data['event_id']), int(data['user_id'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'event_id and user_id are required'}), 400
+    
+    event = db.session.get(Event, event_id)
+    user = db.session.get(User, user_id)
+    # Never touch a live event or a real account
+    if event and event.is_active or user and not user.username.startswith('loadtest_'):
+        return jsonify({'error': 'Not a load test event and user'}), 400
+    
+    entry_log_writer.flush()
+    telemetry.forget(LOAD_TEST_DEVICE_PREFIX)
+    ticket_ids = db.select(Ticket.id).where(Ticket.event_id == event_id)
+    db.session.execute(db.delete(EntryLog).where(db.or_(
+        EntryLog.ticket_id.in_(ticket_ids), prefix_match(EntryLog.device_id, LOAD_TEST_DEVICE_PREFIX))))
+    db.session.execute(db.delete(DeviceTelemetry).where(
+        prefix_match(DeviceTelemetry.device_id, LOAD_TEST_DEVICE_PREFIX)))
+    db.session.execute(db.delete(Device).where(prefix_match(Device.id, LOAD_TEST_DEVICE_PREFIX)))
+    if event:
+        db.session.execute(db.delete(TicketChange).where(TicketChange.event_id == event_id))
+        db.session.execute(db.delete(Ticket).where(Ticket.event_id == event_id))
+        db.session.execute(db.delete(Event).where(Event.id == event_id))
+    if user:
+        db.session.delete(user)
+    db.session.commit()
+    return jsonify({'message': 'Load test data removed'}), 200
 
 @app.route('/ticket/<ticket_id>')
 @login_required
@@ -459,9 +2508,174 @@ def view_ticket(ticket_id):
     
     return render_template('ticket_detail.html', ticket=ticket)
 
+@app.route('/ticket/<ticket_id>/qr.png')
+@login_required
+def ticket_qr(ticket_id):
+    """Render the ticket's QR code on demand instead of storing the image"""
+    ticket = Ticket.query.filter_by(ticket_id=ticket_id).first_or_404()
+    
+    if ticket.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    if ticket.payment_status != 'paid':
+        return jsonify({'error': 'Ticket not paid'}), 404
+    
+    # The image is a pure function of qr_code, so its hash is a strong validator
+    etag = hashlib.sha256(ticket.qr_code.encode()).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(get_qr_png(ticket.qr_code), mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+@app.route('/ticket/<ticket_id>/status')
+@login_required
+def ticket_status(ticket_id):
+    """Polling endpoint for the outcome of a background payment"""
+    ticket = Ticket.query.filter_by(ticket_id=ticket_id).first_or_404()
+    
+    if ticket.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    result = {
+        'ticket_id': ticket.ticket_id,
+        'payment_status': ticket.payment_status,
+        'payment_reference': ticket.payment_reference
+    }
+    if ticket.payment_status == 'paid':
+        result['qr_code'] = ticket.qr_code
+    
+    response = jsonify(result)
+    response.headers['Cache-Control'] = 'no-store'
+    return response, 200
+
+# Schema migrations
+def _column_names(table):
+    return {column['name'] for column in db.inspect(db.engine).get_columns(table)}
+
+def migrate_event_inventory():
+    """Add the reserved/sold counters to event and backfill them from tickets"""
+    columns = _column_names('event')
+    for column in ('reserved_count', 'sold_count'):
+        if column not in columns:
+            db.session.execute(db.text(
+                f'ALTER TABLE event ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0'
+            ))
+    db.session.execute(db.text("""
+        UPDATE event SET
+            reserved_count = (SELECT COUNT(*) FROM ticket
+                              WHERE ticket.event_id = event.id AND ticket.payment_status = 'pending'),
+            sold_count = (SELECT COUNT(*) FROM ticket
+                          WHERE ticket.event_id = event.id AND ticket.payment_status = 'paid')
+    """))
+
+def migrate_drop_qr_images():
+    """
+    QR images are rendered on demand now; clear the stored base64 blobs.
+    SQLite keeps the freed pages, so the file only shrinks after a VACUUM.
+    """
+    cleared = db.session.execute(db.text(
+        'UPDATE ticket SET qr_image_data = NULL WHERE qr_image_data IS NOT NULL'
+    )).rowcount
+    if cleared:
+        # Not run here: VACUUM rewrites the whole file under an exclusive lock
+        print(f"Cleared {cleared} stored QR images; run VACUUM in a quiet window to shrink the database file")
+
+def migrate_complimentary_flag():
+    """Add the complimentary flag used by bulk issuance"""
+    if 'is_complimentary' not in _column_names('ticket'):
+        db.session.execute(db.text(
+            'ALTER TABLE ticket ADD COLUMN is_complimentary BOOLEAN NOT NULL DEFAULT 0'
+        ))
+
+def migrate_entry_log_nullable_ticket():
+    """Allow entry logs without a ticket, which is how scans of unknown codes are recorded"""
+    columns = {column['name']: column for column in db.inspect(db.engine).get_columns('entry_log')}
+    if columns['ticket_id']['nullable']:
+        return
+    # SQLite cannot relax NOT NULL in place, so rebuild the table
+    db.session.execute(db.text('ALTER TABLE entry_log RENAME TO entry_log_old'))
+    db.session.execute(db.text("""
+        CREATE TABLE entry_log (
+            id INTEGER NOT NULL PRIMARY KEY,
+            ticket_id INTEGER REFERENCES ticket (id),
+            entry_time DATETIME,
+            status VARCHAR(20),
+            device_id VARCHAR(50)
+        )
+    """))
+    db.session.execute(db.text("""
+        INSERT INTO entry_log (id, ticket_id, entry_time, status, device_id)
+        SELECT id, ticket_id, entry_time, status, device_id FROM entry_log_old
+    """))
+    db.session.execute(db.text('DROP TABLE entry_log_old'))
+
+def migrate_event_stats():
+    """Add the used/revenue counters to event and backfill all event stats"""
+    columns = _column_names('event')
+    if 'used_count' not in columns:
+        db.session.execute(db.text('ALTER TABLE event ADD COLUMN used_count INTEGER NOT NULL DEFAULT 0'))
+    if 'revenue' not in columns:
+        db.session.execute(db.text('ALTER TABLE event ADD COLUMN revenue FLOAT NOT NULL DEFAULT 0'))
+    rebuild_event_stats()
+
+def migrate_user_listing_indexes():
+    """Indexes behind the paginated, searchable user administration"""
+    db.session.execute(db.text('CREATE INDEX IF NOT EXISTS ix_user_phone ON user (phone)'))
+    db.session.execute(db.text('CREATE INDEX IF NOT EXISTS ix_user_created_at_id ON user (created_at, id)'))
+    db.session.execute(db.text(
+        'CREATE INDEX IF NOT EXISTS ix_ticket_user_id_purchase_date ON ticket (user_id, purchase_date)'
+    ))
+
+def migrate_hot_query_indexes():
+    """Indexes behind gate manifests, event stats and the admin entry feed"""
+    db.session.execute(db.text(
+        'CREATE INDEX IF NOT EXISTS ix_ticket_event_id_payment_status_is_used '
+        'ON ticket (event_id, payment_status, is_used)'
+    ))
+    db.session.execute(db.text('CREATE INDEX IF NOT EXISTS ix_entry_log_entry_time ON entry_log (entry_time)'))
+    db.session.execute(db.text('CREATE INDEX IF NOT EXISTS ix_entry_log_ticket_id ON entry_log (ticket_id)'))
+
+def migrate_pending_payment_index():
+    """Index behind the sweep for stale pending payments"""
+    db.session.execute(db.text(
+        'CREATE INDEX IF NOT EXISTS ix_ticket_payment_status_purchase_date '
+        'ON ticket (payment_status, purchase_date)'
+    ))
+
+# (version, name, function) - append only, never renumber
+MIGRATIONS = [
+    (1, 'event inventory counters', migrate_event_inventory),
+    (2, 'drop stored QR images', migrate_drop_qr_images),
+    (3, 'complimentary ticket flag', migrate_complimentary_flag),
+    (4, 'nullable entry log ticket', migrate_entry_log_nullable_ticket),
+    (5, 'event stats counters', migrate_event_stats),
+    (6, 'user listing indexes', migrate_user_listing_indexes),
+    (7, 'hot query indexes', migrate_hot_query_indexes),
+    (8, 'pending payment index', migrate_pending_payment_index),
+]
+
+def upgrade_schema():
+    """Apply any migrations the database has not seen yet"""
+    applied = {migration.version for migration in SchemaMigration.query.all()}
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        migrate()
+        db.session.add(SchemaMigration(version=version, name=name))
+        db.session.commit()
+        print(f"Applied migration {version}: {name}")
+
 def init_database():
     """Initialize database and create admin user if needed"""
     db.create_all()
+    upgrade_schema()
+    
+    # Payments queued in memory by a previous run are gone; free their seats
+    expired = expire_stale_payments()
+    if expired:
+        print(f"Expired {expired} payments left pending")
     
     # Create admin user if doesn't exist
     admin = User.query.filter_by(username='admin').first()
@@ -477,6 +2691,60 @@ def init_database():
         db.session.commit()
         print("Admin user created: username=admin, password=admin123")
 
+# CLI Commands
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Expire stale pending payments, then recompute every per-event counter from the tickets"""
+    expired = expire_stale_payments()
+    rebuild_event_stats()
+    db.session.commit()
+    click.echo(f'Expired {expired} stale pending payments; event stats rebuilt')
+
+@app.cli.command('db-upgrade')
+@click.option('--status', is_flag=True, help='List applied and pending migrations without applying them')
+def db_upgrade_command(status):
+    """Create missing tables and apply pending schema migrations"""
+    db.create_all()
+    if status:
+        applied = {migration.version: migration for migration in SchemaMigration.query.all()}
+        for version, name, _ in MIGRATIONS:
+            migration = applied.get(version)
+            state = f'applied {migration.applied_at:%Y-%m-%d %H:%M}' if migration else 'pending'
+            click.echo(f'{version:>3}  {name:<32} {state}')
+        return
+    upgrade_schema()
+    click.echo(f'Schema at version {MIGRATIONS[-1][0]}')
+
+@app.cli.command('issue-comps')
+@click.argument('event_id', type=int)
+@click.argument('usernames', nargs=-1, required=True)
+@click.option('--count', default=1, show_default=True, help='Tickets per user')
+@click.option('--qr-dir', type=click.Path(file_okay=False), help='Write QR PNGs to this directory')
+@click.option('--workers', type=int, help='QR render processes (default: CPU count)')
+def issue_comps_command(event_id, usernames, count, qr_dir, workers):
+    """Issue complimentary tickets for EVENT_ID to USERNAMES"""
+    event = db.session.get(Event, event_id)
+    if not event:
+        raise click.ClickException(f'Event {event_id} not found')
+    
+    users = User.query.filter(User.username.in_(usernames)).all()
+    missing = set(usernames) - {user.username for user in users}
+    if missing:
+        raise click.ClickException(f"Unknown users: {', '.join(sorted(missing))}")
+    
+    try:
+        tickets, elapsed = issue_complimentary_tickets(event, users, count)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Issued {len(tickets)} tickets in {elapsed:.2f}s ({len(tickets) / elapsed:,.0f} tickets/s)')
+    
+    if qr_dir:
+        started = time.perf_counter()
+        render_qr_files(tickets, qr_dir, workers)
+        elapsed = time.perf_counter() - started
+        click.echo(f'Rendered {len(tickets)} QR codes to {qr_dir} in {elapsed:.2f}s '
+                   f'({len(tickets) / elapsed:,.0f} images/s)')
+
 if __name__ == '__main__':
     with app.app_context():
         init_database()
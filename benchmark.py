@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for Smart Ticketing System
+Builds a throwaway SQLite dataset, drives the hot paths in-process through
+the Flask test client and records ops/sec, latency and query counts.
+
+    python benchmark.py --tickets 50000 --save             # record a baseline
+    python benchmark.py --tickets 50000                    # compare against it
+    python benchmark.py --tickets 50000 --plans            # hot query plans without/with indexes
+"""
+
+import argparse
+import atexit
+import json
+import math
+import os
+import random
+import secrets
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# The app binds its database at import time, so point it at a scratch file first
+SCRATCH_DIR = tempfile.mkdtemp(prefix='ticketing-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'bench.db')}"
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+import app as ticketing
+from sqlalchemy import event as sa_event
+from werkzeug.security import generate_password_hash
+
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+# SQL statements one request may run on its own thread, whatever the dataset size
+QUERY_BUDGETS = {
+    'validate_qr': 3,
+    'purchase_ticket': 4,
+    'admin_dashboard': 2,
+    'dashboard': 2,
+    'index': 1,
+    'manage_users': 1,
+    'manage_events': 1,
+}
+
+# Hot query shapes and the indexes that serve them, for --plans
+HOT_QUERIES = {
+    'gate manifest': "SELECT qr_code FROM ticket WHERE event_id = :event_id "
+                     "AND payment_status = 'paid' AND is_used = 0",
+    'event sales': "SELECT COUNT(*) FROM ticket WHERE event_id = :event_id AND payment_status = 'paid'",
+    # What dashboard() runs; only the user_id prefix of the index helps, the sort stays a temp B-tree
+    'dashboard page': "SELECT ticket.id FROM ticket JOIN event ON event.id = ticket.event_id "
+                      "WHERE ticket.user_id = :user_id AND event.date >= :now "
+                      "ORDER BY event.date, ticket.id LIMIT 25",
+    'recent entries': "SELECT id FROM entry_log ORDER BY entry_time DESC LIMIT 10",
+    'ticket entries': "SELECT id, status FROM entry_log WHERE ticket_id = :ticket_id",
+}
+HOT_QUERY_INDEXES = [
+    'ix_ticket_event_id_payment_status_is_used',
+    'ix_ticket_user_id_purchase_date',
+    'ix_entry_log_entry_time',
+    'ix_entry_log_ticket_id',
+]
+
+class QueryCounter:
+    """Counts SQL statements sent to the engine"""
+    
+    def __init__(self, engine):
+        self.count = 0
+        sa_event.listen(engine, 'before_cursor_execute', self._increment)
+    
+    def _increment(self, *args):
+        self.count += 1
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+def build_dataset(users, events, tickets, season_tickets):
+    """Users, events (one happening now) and tickets in bulk; returns handles for the benchmarks"""
+    db = ticketing.db
+    ticketing.init_database()
+    password_hash = generate_password_hash('benchpass')
+    now = datetime.utcnow()
+    
+    db.session.execute(db.insert(ticketing.User), [
+        {'username': f'bench_{i}', 'email': f'bench_{i}@example.com', 'phone': f'+25078{i:07d}',
+         'password_hash': password_hash, 'created_at': now - timedelta(minutes=i)}
+        for i in range(users)
+    ])
+    db.session.execute(db.insert(ticketing.Event), [
+        {'name': f'Bench Event {i}', 'description': 'Benchmark event', 'price': 5000,
+         'date': now + timedelta(hours=1) if i == 0 else now + timedelta(days=i - events // 2),
+         'location': 'Kigali Arena', 'max_capacity': tickets * 2}
+        for i in range(events)
+    ])
+    db.session.commit()
+    
+    user_ids = db.session.scalars(db.select(ticketing.User.id).where(ticketing.User.username.like('bench_%'))).all()
+    event_ids = db.session.scalars(db.select(ticketing.Event.id).order_by(ticketing.Event.id)).all()
+    today_event, season_holder = event_ids[0], user_ids[0]
+    
+    rows = []
+    for i in range(tickets):
+        # The season-pass holder gets the first batch, the event happening now gets a third
+        user_id = season_holder if i < season_tickets else random.choice(user_ids)
+        event_id = today_event if i % 3 == 0 else random.choice(event_ids)
+        paid = random.random() < 0.85
+        rows.append({
+            'ticket_id': f'{secrets.token_hex(16)}',
+            'qr_code': secrets.token_urlsafe(32),
+            'user_id': user_id,
+            'event_id': event_id,
+            'payment_status': 'paid' if paid else random.choice(['pending', 'failed']),
+            'is_used': paid and event_id != today_event and random.random() < 0.3,
+            'purchase_date': now - timedelta(minutes=random.randint(0, 60 * 24 * 90))
+        })
+    for offset in range(0, len(rows), 5000):
+        db.session.execute(db.insert(ticketing.Ticket), rows[offset:offset + 5000])
+    db.session.commit()
+    
+    # One gate scan for every other ticket, spread over the last 90 days
+    ticket_ids = db.session.scalars(db.select(ticketing.Ticket.id)).all()
+    entries = [{
+        'ticket_id': ticket_id,
+        'entry_time': now - timedelta(minutes=random.randint(0, 60 * 24 * 90)),
+        'status': random.choice(['granted', 'denied']),
+        'device_id': f'GATE_{ticket_id % 16}'
+    } for ticket_id in ticket_ids[::2]]
+    for offset in range(0, len(entries), 5000):
+        db.session.execute(db.insert(ticketing.EntryLog), entries[offset:offset + 5000])
+    db.session.commit()
+    ticketing.rebuild_event_stats()
+    db.session.commit()
+    
+    valid_codes = [row['qr_code'] for row in rows
+                   if row['event_id'] == today_event and row['payment_status'] == 'paid']
+    return {
+        'today_event': today_event,
+        'season_holder': f'bench_{user_ids.index(season_holder)}',
+        'season_holder_id': season_holder,
+        'ticket_id': ticket_ids[0],
+        'valid_codes': valid_codes
+    }
+
+def login(client, username, password):
+    response = client.post('/login', json={'username': username, 'password': password})
+    assert response.status_code == 200, response.status_code
+
+def measure(name, operation, iterations, counter):
+    """Run `operation` `iterations` times and summarise latency and queries"""
+    latencies = []
+    queries_before = counter.count
+    started = time.perf_counter()
+    for i in range(iterations):
+        op_started = time.perf_counter()
+        operation(i)
+        latencies.append((time.perf_counter() - op_started) * 1000)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / elapsed, 1),
+        'mean_ms': round(sum(latencies) / iterations, 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'queries_per_op': round((counter.count - queries_before) / iterations, 2)
+    }
+    print(f"{name:<18}{result['ops_per_sec']:>12,.1f}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+          f"{result['p99_ms']:>10.2f}{result['queries_per_op']:>10.2f}")
+    return result
+
+def wait_for_validation_index(timeout=30):
+    deadline = time.monotonic() + timeout
+    while ticketing.validation_index._loaded_at is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+def check_query_budgets(requests):
+    """Run each request once under its budget; returns the failures"""
+    failures = []
+    for name, send in requests.items():
+        try:
+            with ticketing.query_budget(QUERY_BUDGETS[name]):
+                send()
+        except AssertionError as e:
+            failures.append(f'{name}: {e}')
+    return failures
+
+def explain_hot_queries(params, repeat=20):
+    """{name: (plan, mean ms)} for each hot query against the current schema"""
+    db = ticketing.db
+    plans = {}
+    for name, sql in HOT_QUERIES.items():
+        plan = [row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'), params)]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            db.session.execute(db.text(sql), params).all()
+        plans[name] = (plan, (time.perf_counter() - started) * 1000 / repeat)
+    return plans
+
+def compare_query_plans(dataset):
+    """Query plans and timings without, then with, the hot query indexes"""
+    db = ticketing.db
+    params = {'event_id': dataset['today_event'], 'user_id': dataset['season_holder_id'],
+              'ticket_id': dataset['ticket_id'], 'now': datetime.utcnow().isoformat(' ')}
+    definitions = dict(db.session.execute(db.text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name IN :names"
+    ).bindparams(db.bindparam('names', expanding=True)), {'names': HOT_QUERY_INDEXES}).all())
+    
+    for name in definitions:
+        db.session.execute(db.text(f'DROP INDEX {name}'))
+    db.session.execute(db.text('ANALYZE'))
+    before = explain_hot_queries(params)
+    for sql in definitions.values():
+        db.session.execute(db.text(sql))
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    after = explain_hot_queries(params)
+    
+    for name in HOT_QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[name], after[name]
+        print(f"\n{name}: {ms_before:.3f} ms -> {ms_after:.3f} ms")
+        print(f"  before: {'; '.join(plan_before)}")
+        print(f"  after:  {'; '.join(plan_after)}")
+
+def run_benchmarks(args):
+    app = ticketing.app
+    app.config['TESTING'] = True
+    # Payments settle instantly and gates are not throttled during benchmarks
+    ticketing.process_mobile_payment = lambda phone, amount, reference: {
+        'status': 'success', 'transaction_id': f'MM{secrets.token_hex(8).upper()}', 'message': 'ok'
+    }
+    for limiter in ticketing.rate_limiters.values():
+        limiter.rate = limiter.burst = float('inf')
+    
+    with app.app_context():
+        print(f"Building dataset: {args.users} users, {args.events} events, {args.tickets} tickets...")
+        dataset = build_dataset(args.users, args.events, args.tickets, args.season_tickets)
+        if args.plans:
+            compare_query_plans(dataset)
+            return None
+        counter = QueryCounter(ticketing.db.engine)
+    
+    admin = app.test_client()
+    login(admin, 'admin', 'admin123')
+    holder = app.test_client()
+    login(holder, dataset['season_holder'], 'benchpass')
+    gate = app.test_client()
+    
+    iterations = args.iterations
+    codes = dataset['valid_codes']
+    budget_code = codes.pop()
+    scan_iterations = min(iterations, len(codes))
+    
+    # Warm the gate index first so the budget covers a steady-state scan; it loads in the background
+    gate.post('/api/validate_qr', json={'qr_code': 'warm-up', 'device_id': 'BENCH_BUDGET'})
+    wait_for_validation_index()
+    budget_failures = check_query_budgets({
+        'validate_qr': lambda: gate.post('/api/validate_qr', json={
+            'qr_code': budget_code, 'device_id': 'BENCH_BUDGET'}),
+        'purchase_ticket': lambda: holder.post(f"/purchase/{dataset['today_event']}", json={}),
+        'admin_dashboard': lambda: admin.get('/admin'),
+        'dashboard': lambda: holder.get('/dashboard'),
+        'index': lambda: holder.get('/?upcoming=1'),
+        'manage_users': lambda: admin.get('/admin/users'),
+        'manage_events': lambda: admin.get('/admin/events'),
+    })
+    
+    print(f"\n{'Benchmark':<18}{'ops/sec':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}")
+    results = {
+        'generate_qr_code': measure(
+            'generate_qr_code', lambda i: ticketing.generate_qr_code(secrets.token_urlsafe(32)),
+            iterations, counter),
+        'validate_qr': measure(
+            'validate_qr', lambda i: gate.post('/api/validate_qr', json={
+                'qr_code': codes[i], 'device_id': f'BENCH_{i % 8}'}),
+            scan_iterations, counter),
+        'purchase_ticket': measure(
+            'purchase_ticket', lambda i: holder.post(f"/purchase/{dataset['today_event']}", json={}),
+            iterations, counter),
+        'admin_dashboard': measure(
+            'admin_dashboard', lambda i: admin.get('/admin'), iterations, counter),
+        'dashboard': measure(
+            'dashboard', lambda i: holder.get('/dashboard'), iterations, counter),
+    }
+    ticketing.entry_log_writer.flush()
+    
+    return {
+        'dataset': {'users': args.users, 'events': args.events, 'tickets': args.tickets,
+                    'season_tickets': args.season_tickets},
+        'recorded_at': datetime.utcnow().isoformat(),
+        'results': results,
+        'budget_failures': budget_failures
+    }
+
+def compare_to_baseline(report, baseline, tolerance):
+    """List of regressions: throughput down or query count up beyond tolerance"""
+    regressions = []
+    for name, result in report['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous:
+            continue
+        if result['ops_per_sec'] < previous['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops_per_sec']:,.1f} ops/sec "
+                               f"vs baseline {previous['ops_per_sec']:,.1f}")
+        if result['queries_per_op'] > previous['queries_per_op'] + 0.5:
+            regressions.append(f"{name}: {result['queries_per_op']} queries/op "
+                               f"vs baseline {previous['queries_per_op']}")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Smart Ticketing System - hot path benchmarks')
+    parser.add_argument('--users', type=int, default=2000, help='Registered users to create')
+    parser.add_argument('--events', type=int, default=20, help='Events to create')
+    parser.add_argument('--tickets', type=int, default=20000, help='Tickets to create')
+    parser.add_argument('--season-tickets', type=int, default=300, help='Tickets held by one user')
+    parser.add_argument('--iterations', type=int, default=200, help='Operations per benchmark')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed throughput drop (0.2 = 20%%)')
+    parser.add_argument('--plans', action='store_true',
+                        help='Show hot query plans without and with their indexes, then exit')
+    args = parser.parse_args()
+    
+    report = run_benchmarks(args)
+    if report is None:
+        sys.exit(0)
+    
+    if report['budget_failures']:
+        print("\n❌ Query budgets exceeded:")
+        for failure in report.pop('budget_failures'):
+            print(f"  - {failure}")
+        sys.exit(1)
+    report.pop('budget_failures')
+    
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        sys.exit(0)
+    
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
+        sys.exit(0)
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('dataset') != report['dataset']:
+        print("\nWarning: baseline was recorded with a different dataset size")
+    regressions = compare_to_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\n✅ No regressions against baseline")
@@ -14,7 +14,8 @@ def create_missing_templates():
     
     # Template contents
     templates = {
-        'base.html': '''<!DOCTYPE html>
+        'base.html': '''<!-- templates/base.html - Updated with professional styling -->
+<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -22,91 +23,479 @@ def create_missing_templates():
     <title>{% block title %}Smart Ticketing System{% endblock %}</title>
     <link href="https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/css/bootstrap.min.css" rel="stylesheet">
     <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
     <style>
-        .qr-code-container { text-align: center; margin: 20px 0; }
-        .ticket-card { border: 2px solid #007bff; border-radius: 10px; padding: 20px; margin: 10px 0; box-shadow: 0 4px 6px rgba(0,0,0,0.1); }
-        .status-paid { border-color: #28a745; }
-        .status-pending { border-color: #ffc107; }
-        .status-failed { border-color: #dc3545; }
-        .navbar-brand { font-weight: bold; }
-        .footer { margin-top: 50px; padding: 20px 0; background-color: #f8f9fa; }
+        :root {
+            --primary-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            --success-gradient: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
+            --warning-gradient: linear-gradient(135deg, #fa709a 0%, #fee140 100%);
+            --danger-gradient: linear-gradient(135deg, #ff6b6b 0%, #ffa726 100%);
+            --info-gradient: linear-gradient(135deg, #a8edea 0%, #fed6e3 100%);
+            --dark-gradient: linear-gradient(135deg, #2c3e50 0%, #34495e 100%);
+            --card-shadow: 0 10px 30px rgba(0, 0, 0, 0.1);
+            --card-hover-shadow: 0 15px 40px rgba(0, 0, 0, 0.15);
+        }
+
+        body {
+            font-family: 'Inter', sans-serif;
+            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+            min-height: 100vh;
+        }
+
+        .navbar {
+            background: var(--primary-gradient) !important;
+            box-shadow: 0 2px 20px rgba(0, 0, 0, 0.1);
+            backdrop-filter: blur(10px);
+        }
+
+        .navbar-brand {
+            font-weight: 700;
+            font-size: 1.5rem;
+        }
+
+        .card {
+            border: none;
+            border-radius: 20px;
+            box-shadow: var(--card-shadow);
+            transition: all 0.3s ease;
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(10px);
+        }
+
+        .card:hover {
+            transform: translateY(-5px);
+            box-shadow: var(--card-hover-shadow);
+        }
+
+        .ticket-card {
+            border: none;
+            border-radius: 20px;
+            padding: 25px;
+            margin: 15px 0;
+            box-shadow: var(--card-shadow);
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(10px);
+            position: relative;
+            overflow: hidden;
+            transition: all 0.3s ease;
+        }
+
+        .ticket-card::before {
+            content: '';
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            height: 5px;
+            background: var(--primary-gradient);
+        }
+
+        .ticket-card:hover {
+            transform: translateY(-8px);
+            box-shadow: var(--card-hover-shadow);
+        }
+
+        .status-paid::before { background: var(--success-gradient); }
+        .status-pending::before { background: var(--warning-gradient); }
+        .status-failed::before { background: var(--danger-gradient); }
+
+        .qr-code-container {
+            text-align: center;
+            margin: 25px 0;
+            padding: 20px;
+            background: rgba(255, 255, 255, 0.8);
+            border-radius: 15px;
+            border: 2px dashed #e0e6ed;
+        }
+
+        .qr-code-container img {
+            border-radius: 10px;
+            box-shadow: 0 5px 15px rgba(0, 0, 0, 0.1);
+        }
+
+        .badge {
+            padding: 8px 16px;
+            border-radius: 50px;
+            font-weight: 500;
+            font-size: 0.85rem;
+        }
+
+        .btn {
+            border-radius: 50px;
+            padding: 12px 30px;
+            font-weight: 500;
+            transition: all 0.3s ease;
+            position: relative;
+            overflow: hidden;
+        }
+
+        .btn-primary {
+            background: var(--primary-gradient);
+            border: none;
+        }
+
+        .btn-success {
+            background: var(--success-gradient);
+            border: none;
+        }
+
+        .btn:hover {
+            transform: translateY(-2px);
+            box-shadow: 0 8px 25px rgba(0, 0, 0, 0.15);
+        }
+
+        .stats-card {
+            background: rgba(255, 255, 255, 0.95);
+            border: none;
+            border-radius: 20px;
+            padding: 30px;
+            text-align: center;
+            position: relative;
+            overflow: hidden;
+            transition: all 0.3s ease;
+        }
+
+        .stats-card::before {
+            content: '';
+            position: absolute;
+            top: 0;
+            left: 0;
+            right: 0;
+            bottom: 0;
+            background: var(--primary-gradient);
+            opacity: 0.1;
+            transition: opacity 0.3s ease;
+        }
+
+        .stats-card:hover::before {
+            opacity: 0.15;
+        }
+
+        .stats-card:hover {
+            transform: translateY(-5px);
+            box-shadow: var(--card-hover-shadow);
+        }
+
+        .stats-icon {
+            font-size: 3rem;
+            margin-bottom: 15px;
+            background: var(--primary-gradient);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            background-clip: text;
+        }
+
+        .stats-number {
+            font-size: 2.5rem;
+            font-weight: 700;
+            margin-bottom: 10px;
+            color: #2c3e50;
+        }
+
+        .stats-label {
+            font-size: 1rem;
+            color: #7f8c8d;
+            font-weight: 500;
+        }
+
+        .page-header {
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(10px);
+            border-radius: 20px;
+            padding: 30px;
+            margin-bottom: 30px;
+            box-shadow: var(--card-shadow);
+            text-align: center;
+        }
+
+        .page-title {
+            font-size: 2.5rem;
+            font-weight: 700;
+            background: var(--primary-gradient);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            background-clip: text;
+            margin-bottom: 10px;
+        }
+
+        .page-subtitle {
+            color: #7f8c8d;
+            font-size: 1.1rem;
+            font-weight: 400;
+        }
+
+        .empty-state {
+            text-align: center;
+            padding: 60px 20px;
+            background: rgba(255, 255, 255, 0.95);
+            border-radius: 20px;
+            box-shadow: var(--card-shadow);
+        }
+
+        .empty-state i {
+            font-size: 5rem;
+            margin-bottom: 30px;
+            background: var(--primary-gradient);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            background-clip: text;
+        }
+
+        .empty-state h3 {
+            color: #2c3e50;
+            margin-bottom: 15px;
+        }
+
+        .empty-state p {
+            color: #7f8c8d;
+            font-size: 1.1rem;
+            margin-bottom: 30px;
+        }
+
+        .footer {
+            margin-top: 80px;
+            padding: 40px 0;
+            background: rgba(255, 255, 255, 0.95);
+            backdrop-filter: blur(10px);
+        }
+
+        .alert {
+            border: none;
+            border-radius: 15px;
+            padding: 20px;
+            margin-bottom: 25px;
+        }
+
+        .navbar-nav .dropdown-menu {
+            border-radius: 15px;
+            border: none;
+            box-shadow: var(--card-shadow);
+            backdrop-filter: blur(10px);
+            background: rgba(255, 255, 255, 0.95);
+        }
+
+        .table {
+            background: rgba(255, 255, 255, 0.95);
+            border-radius: 15px;
+            overflow: hidden;
+            box-shadow: var(--card-shadow);
+        }
+
+        .table thead {
+            background: var(--primary-gradient);
+            color: white;
+        }
+
+        .btn-outline-primary {
+            border: 2px solid;
+            border-image: var(--primary-gradient) 1;
+            color: #667eea;
+            background: transparent;
+        }
+
+        .btn-outline-primary:hover {
+            background: var(--primary-gradient);
+            border: 2px solid transparent;
+            color: white;
+        }
+
+        @media (max-width: 768px) {
+            .page-title {
+                font-size: 2rem;
+            }
+            
+            .stats-card {
+                margin-bottom: 20px;
+            }
+            
+            .ticket-card {
+                margin: 10px 0;
+                padding: 20px;
+            }
+        }
+
+        /* Loading animation */
+        .loading {
+            display: inline-block;
+            width: 20px;
+            height: 20px;
+            border: 3px solid rgba(255, 255, 255, 0.3);
+            border-radius: 50%;
+            border-top-color: #fff;
+            animation: spin 1s ease-in-out infinite;
+        }
+
+        @keyframes spin {
+            to { transform: rotate(360deg); }
+        }
+
+        /* Pulse animation for new items */
+        @keyframes pulse {
+            0% { transform: scale(1); }
+            50% { transform: scale(1.05); }
+            100% { transform: scale(1); }
+        }
+
+        .pulse {
+            animation: pulse 2s infinite;
+        }
     </style>
 </head>
 <body>
-    <nav class="navbar navbar-expand-lg navbar-dark bg-primary">
+    <nav class="navbar navbar-expand-lg navbar-dark">
         <div class="container">
             <a class="navbar-brand" href="{{ url_for('index') }}">
-                <i class="fas fa-ticket-alt"></i> Smart Ticketing
+                <i class="fas fa-ticket-alt me-2"></i>Smart Ticketing
             </a>
+            
             <button class="navbar-toggler" type="button" data-bs-toggle="collapse" data-bs-target="#navbarNav">
                 <span class="navbar-toggler-icon"></span>
             </button>
+            
             <div class="collapse navbar-collapse" id="navbarNav">
                 <ul class="navbar-nav me-auto">
-                    <li class="nav-item"><a class="nav-link" href="{{ url_for('index') }}">Events</a></li>
+                    <li class="nav-item">
+                        <a class="nav-link" href="{{ url_for('index') }}">
+                            <i class="fas fa-calendar-alt me-1"></i>Events
+                        </a>
+                    </li>
                     {% if current_user.is_authenticated %}
-                    <li class="nav-item"><a class="nav-link" href="{{ url_for('dashboard') }}">My Tickets</a></li>
+                    <li class="nav-item">
+                        <a class="nav-link" href="{{ url_for('dashboard') }}">
+                            <i class="fas fa-tickets-alt me-1"></i>My Tickets
+                        </a>
+                    </li>
                     {% if current_user.is_admin %}
                     <li class="nav-item dropdown">
-                        <a class="nav-link dropdown-toggle" href="#" role="button" data-bs-toggle="dropdown">Admin</a>
+                        <a class="nav-link dropdown-toggle" href="#" role="button" data-bs-toggle="dropdown">
+                            <i class="fas fa-cog me-1"></i>Admin
+                        </a>
                         <ul class="dropdown-menu">
-                            <li><a class="dropdown-item" href="{{ url_for('admin_dashboard') }}">Dashboard</a></li>
-                            <li><a class="dropdown-item" href="{{ url_for('manage_events') }}">Manage Events</a></li>
-                            <li><a class="dropdown-item" href="{{ url_for('manage_users') }}">Manage Users</a></li>
+                            <li><a class="dropdown-item" href="{{ url_for('admin_dashboard') }}">
+                                <i class="fas fa-tachometer-alt me-2"></i>Dashboard
+                            </a></li>
+                            <li><a class="dropdown-item" href="{{ url_for('manage_events') }}">
+                                <i class="fas fa-calendar-plus me-2"></i>Manage Events
+                            </a></li>
+                            <li><a class="dropdown-item" href="{{ url_for('manage_users') }}">
+                                <i class="fas fa-users me-2"></i>Manage Users
+                            </a></li>
                         </ul>
                     </li>
                     {% endif %}
                     {% endif %}
                 </ul>
+                
                 <ul class="navbar-nav">
                     {% if current_user.is_authenticated %}
                     <li class="nav-item dropdown">
                         <a class="nav-link dropdown-toggle" href="#" role="button" data-bs-toggle="dropdown">
-                            <i class="fas fa-user"></i> {{ current_user.username }}
+                            <i class="fas fa-user-circle me-1"></i>{{ current_user.username }}
                         </a>
                         <ul class="dropdown-menu">
-                            <li><a class="dropdown-item" href="{{ url_for('logout') }}">Logout</a></li>
+                            <li><a class="dropdown-item" href="{{ url_for('logout') }}">
+                                <i class="fas fa-sign-out-alt me-2"></i>Logout
+                            </a></li>
                         </ul>
                     </li>
                     {% else %}
-                    <li class="nav-item"><a class="nav-link" href="{{ url_for('login') }}">Login</a></li>
-                    <li class="nav-item"><a class="nav-link" href="{{ url_for('register') }}">Register</a></li>
+                    <li class="nav-item">
+                        <a class="nav-link" href="{{ url_for('login') }}">
+                            <i class="fas fa-sign-in-alt me-1"></i>Login
+                        </a>
+                    </li>
+                    <li class="nav-item">
+                        <a class="nav-link" href="{{ url_for('register') }}">
+                            <i class="fas fa-user-plus me-1"></i>Register
+                        </a>
+                    </li>
                     {% endif %}
                 </ul>
             </div>
         </div>
     </nav>
+
     <main class="container mt-4">
         {% with messages = get_flashed_messages() %}
             {% if messages %}
                 {% for message in messages %}
                     <div class="alert alert-info alert-dismissible fade show" role="alert">
-                        {{ message }}
+                        <i class="fas fa-info-circle me-2"></i>{{ message }}
                         <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
                     </div>
                 {% endfor %}
             {% endif %}
         {% endwith %}
+
         {% block content %}{% endblock %}
     </main>
-    <footer class="footer mt-auto bg-light">
+
+    <footer class="footer mt-auto">
         <div class="container text-center">
-            <span class="text-muted">&copy; 2025 Smart Ticketing System - Secure, Fast, Efficient</span>
+            <div class="row">
+                <div class="col-md-6">
+                    <h5 class="mb-3">Smart Ticketing System</h5>
+                    <p class="text-muted">Secure • Fast • Efficient</p>
+                </div>
+                <div class="col-md-6">
+                    <div class="d-flex justify-content-center justify-content-md-end">
+                        <i class="fas fa-shield-alt me-2 text-success"></i>
+                        <small class="text-muted">Powered by Advanced QR Technology</small>
+                    </div>
+                </div>
+            </div>
+            <hr class="my-4">
+            <span class="text-muted">&copy; 2025 Smart Ticketing System. All rights reserved.</span>
         </div>
     </footer>
+
     <script src="https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/js/bootstrap.bundle.min.js"></script>
     {% block scripts %}{% endblock %}
-</body>
-</html>''',
 
+    <script>
+        // Add smooth scrolling and page transitions
+        document.addEventListener('DOMContentLoaded', function() {
+            // Animate cards on load
+            const cards = document.querySelectorAll('.card, .ticket-card');
+            cards.forEach((card, index) => {
+                card.style.opacity = '0';
+                card.style.transform = 'translateY(20px)';
+                setTimeout(() => {
+                    card.style.transition = 'all 0.6s ease';
+                    card.style.opacity = '1';
+                    card.style.transform = 'translateY(0)';
+                }, index * 100);
+            });
+
+            // Add loading state to buttons
+            
+        });
+    </script>
+</body>
+</html>
+''',
         'index.html': '''{% extends "base.html" %}
+
 {% block title %}Events - Smart Ticketing{% endblock %}
+
 {% block content %}
 <div class="row">
     <div class="col-12">
-        <h1 class="mb-4"><i class="fas fa-calendar-alt"></i> Available Events</h1>
+        <h1 class="mb-4">
+            <i class="fas fa-calendar-alt"></i> Available Events
+        </h1>
+    </div>
+</div>
+
+<div class="row mb-4">
+    <div class="col-12">
+        <div class="btn-group">
+            <a href="{{ url_for('index') }}" class="btn btn-sm {{ 'btn-outline-primary' if upcoming else 'btn-primary' }}">All Events</a>
+            <a href="{{ url_for('index', upcoming=1) }}" class="btn btn-sm {{ 'btn-primary' if upcoming else 'btn-outline-primary' }}">Upcoming</a>
+        </div>
     </div>
 </div>
+
 {% if events %}
 <div class="row">
     {% for event in events %}
@@ -115,24 +504,56 @@ def create_missing_templates():
             <div class="card-body">
                 <h5 class="card-title">{{ event.name }}</h5>
                 <p class="card-text">{{ event.description }}</p>
-                <div class="mb-2"><strong><i class="fas fa-map-marker-alt"></i> Location:</strong> {{ event.location }}</div>
-                <div class="mb-2"><strong><i class="fas fa-calendar"></i> Date:</strong> {{ event.date.strftime('%Y-%m-%d %H:%M') }}</div>
-                <div class="mb-2"><strong><i class="fas fa-users"></i> Capacity:</strong> {{ event.max_capacity }}</div>
-                <div class="mb-3"><strong><i class="fas fa-money-bill"></i> Price:</strong> <span class="text-success">{{ "{:,.0f}".format(event.price) }} RWF</span></div>
+                
+                <div class="mb-2">
+                    <strong><i class="fas fa-map-marker-alt"></i> Location:</strong> {{ event.location }}
+                </div>
+                
+                <div class="mb-2">
+                    <strong><i class="fas fa-calendar"></i> Date:</strong> 
+                    {{ event.date.strftime('%Y-%m-%d %H:%M') }}
+                </div>
+                
+                <div class="mb-2">
+                    <strong><i class="fas fa-users"></i> Capacity:</strong> {{ event.max_capacity }}
+                </div>
+                
+                <div class="mb-3">
+                    <strong><i class="fas fa-money-bill"></i> Price:</strong> 
+                    <span class="text-success">{{ "{:,.0f}".format(event.price) }} RWF</span>
+                </div>
             </div>
+            
             <div class="card-footer">
                 {% if current_user.is_authenticated %}
-                    <a href="{{ url_for('purchase_ticket', event_id=event.id) }}" class="btn btn-primary w-100">
+                    <a href="{{ url_for('purchase_ticket', event_id=event.id) }}" 
+                       class="btn btn-primary w-100">
                         <i class="fas fa-shopping-cart"></i> Purchase Ticket
                     </a>
                 {% else %}
-                    <a href="{{ url_for('login') }}" class="btn btn-outline-primary w-100">Login to Purchase</a>
+                    <a href="{{ url_for('login') }}" class="btn btn-outline-primary w-100">
+                        Login to Purchase
+                    </a>
                 {% endif %}
             </div>
         </div>
     </div>
     {% endfor %}
 </div>
+<nav class="d-flex justify-content-between mb-4">
+    {% if request.args.get('cursor') %}
+    <a class="btn btn-outline-secondary" href="{{ url_for('index', upcoming=1 if upcoming else None) }}">
+        <i class="fas fa-angle-double-left"></i> First Page
+    </a>
+    {% else %}
+    <span></span>
+    {% endif %}
+    {% if next_cursor %}
+    <a class="btn btn-outline-primary" href="{{ url_for('index', upcoming=1 if upcoming else None, cursor=next_cursor) }}">
+        Later Events <i class="fas fa-angle-right"></i>
+    </a>
+    {% endif %}
+</nav>
 {% else %}
 <div class="text-center">
     <i class="fas fa-calendar-times fa-5x text-muted mb-3"></i>
@@ -141,26 +562,33 @@ def create_missing_templates():
 </div>
 {% endif %}
 {% endblock %}''',
-
         'login.html': '''{% extends "base.html" %}
+
 {% block title %}Login - Smart Ticketing{% endblock %}
+
 {% block content %}
 <div class="row justify-content-center">
     <div class="col-md-6">
         <div class="card">
             <div class="card-body">
-                <h2 class="card-title text-center mb-4"><i class="fas fa-sign-in-alt"></i> Login</h2>
+                <h2 class="card-title text-center mb-4">
+                    <i class="fas fa-sign-in-alt"></i> Login
+                </h2>
+                
                 <form method="POST">
                     <div class="mb-3">
                         <label for="username" class="form-label">Username</label>
                         <input type="text" class="form-control" id="username" name="username" required>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="password" class="form-label">Password</label>
                         <input type="password" class="form-control" id="password" name="password" required>
                     </div>
+                    
                     <button type="submit" class="btn btn-primary w-100">Login</button>
                 </form>
+                
                 <div class="text-center mt-3">
                     <p>Don't have an account? <a href="{{ url_for('register') }}">Register here</a></p>
                 </div>
@@ -168,35 +596,46 @@ def create_missing_templates():
         </div>
     </div>
 </div>
-{% endblock %}''',
-
+{% endblock %}
+''',
         'register.html': '''{% extends "base.html" %}
+
 {% block title %}Register - Smart Ticketing{% endblock %}
+
 {% block content %}
 <div class="row justify-content-center">
     <div class="col-md-6">
         <div class="card">
             <div class="card-body">
-                <h2 class="card-title text-center mb-4"><i class="fas fa-user-plus"></i> Register</h2>
+                <h2 class="card-title text-center mb-4">
+                    <i class="fas fa-user-plus"></i> Register
+                </h2>
+                
                 <form method="POST">
                     <div class="mb-3">
                         <label for="username" class="form-label">Username</label>
                         <input type="text" class="form-control" id="username" name="username" required>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="email" class="form-label">Email</label>
                         <input type="email" class="form-control" id="email" name="email" required>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="phone" class="form-label">Phone Number</label>
-                        <input type="tel" class="form-control" id="phone" name="phone" placeholder="+250788000000" required>
+                        <input type="tel" class="form-control" id="phone" name="phone" 
+                               placeholder="+250788000000" required>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="password" class="form-label">Password</label>
                         <input type="password" class="form-control" id="password" name="password" required>
                     </div>
+                    
                     <button type="submit" class="btn btn-primary w-100">Register</button>
                 </form>
+                
                 <div class="text-center mt-3">
                     <p>Already have an account? <a href="{{ url_for('login') }}">Login here</a></p>
                 </div>
@@ -205,67 +644,299 @@ def create_missing_templates():
     </div>
 </div>
 {% endblock %}''',
+        'dashboard.html': '''
+<!-- templates/dashboard.html - Professional redesign -->
+{% extends "base.html" %}
 
-        'dashboard.html': '''{% extends "base.html" %}
 {% block title %}Dashboard - Smart Ticketing{% endblock %}
+
 {% block content %}
-<div class="row">
-    <div class="col-12">
-        <h1 class="mb-4"><i class="fas fa-tickets-alt"></i> My Tickets</h1>
+<!-- Page Header -->
+<div class="page-header">
+    <div class="page-title">
+        <i class="fas fa-tickets-alt me-3"></i>My Tickets
     </div>
+    <p class="page-subtitle">Manage and view all your purchased tickets</p>
 </div>
-{% if tickets %}
-<div class="row">
-    {% for ticket in tickets %}
-    <div class="col-md-6 col-lg-4 mb-4">
-        <div class="ticket-card status-{{ ticket.payment_status }}">
-            <h5>{{ ticket.event.name }}</h5>
-            <p><strong>Location:</strong> {{ ticket.event.location }}</p>
-            <p><strong>Date:</strong> {{ ticket.event.date.strftime('%Y-%m-%d %H:%M') }}</p>
-            <p><strong>Price:</strong> {{ "{:,.0f}".format(ticket.event.price) }} RWF</p>
-            <div class="status-badge mb-3">
-                {% if ticket.payment_status == 'paid' %}
-                    {% if ticket.is_used %}
-                        <span class="badge bg-secondary">Used</span>
-                    {% else %}
-                        <span class="badge bg-success">Valid</span>
+
+{% if counts.total %}
+<!-- Quick Stats Row -->
+<div class="row mb-4">
+    <div class="col-md-3 col-6 mb-3">
+        <div class="stats-card">
+            <i class="fas fa-ticket-alt stats-icon"></i>
+            <div class="stats-number">{{ counts.total }}</div>
+            <div class="stats-label">Total Tickets</div>
+        </div>
+    </div>
+    <div class="col-md-3 col-6 mb-3">
+        <div class="stats-card">
+            <i class="fas fa-check-circle stats-icon"></i>
+            <div class="stats-number">{{ counts.paid }}</div>
+            <div class="stats-label">Valid Tickets</div>
+        </div>
+    </div>
+    <div class="col-md-3 col-6 mb-3">
+        <div class="stats-card">
+            <i class="fas fa-clock stats-icon"></i>
+            <div class="stats-number">{{ counts.pending }}</div>
+            <div class="stats-label">Pending</div>
+        </div>
+    </div>
+    <div class="col-md-3 col-6 mb-3">
+        <div class="stats-card">
+            <i class="fas fa-ban stats-icon"></i>
+            <div class="stats-number">{{ counts.used }}</div>
+            <div class="stats-label">Used Tickets</div>
+        </div>
+    </div>
+</div>
+
+<!-- Filter Tabs -->
+<div class="card mb-4">
+    <div class="card-body">
+        <ul class="nav nav-pills justify-content-center" id="ticketFilter" role="tablist">
+            <li class="nav-item" role="presentation">
+                <button class="nav-link active" id="all-tab" data-bs-toggle="pill" data-bs-target="#all" type="button">
+                    <i class="fas fa-list me-2"></i>All Tickets
+                </button>
+            </li>
+            <li class="nav-item" role="presentation">
+                <button class="nav-link" id="valid-tab" data-bs-toggle="pill" data-bs-target="#valid" type="button">
+                    <i class="fas fa-check-circle me-2"></i>Valid
+                </button>
+            </li>
+            <li class="nav-item" role="presentation">
+                <button class="nav-link" id="pending-tab" data-bs-toggle="pill" data-bs-target="#pending" type="button">
+                    <i class="fas fa-clock me-2"></i>Pending
+                </button>
+            </li>
+            <li class="nav-item" role="presentation">
+                <button class="nav-link" id="used-tab" data-bs-toggle="pill" data-bs-target="#used" type="button">
+                    <i class="fas fa-history me-2"></i>Used
+                </button>
+            </li>
+        </ul>
+    </div>
+</div>
+
+<!-- Tickets Grid -->
+<div class="tab-content" id="ticketFilterContent">
+    <div class="tab-pane fade show active" id="all" role="tabpanel">
+        <div class="row">
+            {% for ticket in tickets %}
+            <div class="col-xl-4 col-lg-6 col-md-6 mb-4 ticket-item" 
+                 data-status="{{ ticket.payment_status }}" 
+                 data-used="{{ ticket.is_used|lower }}">
+                <div class="ticket-card status-{{ ticket.payment_status }}">
+                    <!-- Ticket Header -->
+                    <div class="d-flex justify-content-between align-items-start mb-3">
+                        <div>
+                            <h5 class="mb-1 fw-bold">{{ ticket.event.name }}</h5>
+                            <small class="text-muted">
+                                <i class="fas fa-hashtag me-1"></i>{{ ticket.ticket_id[:8] }}...
+                            </small>
+                        </div>
+                        <div class="status-badge">
+                            {% if ticket.payment_status == 'paid' %}
+                                {% if ticket.is_used %}
+                                    <span class="badge bg-secondary">
+                                        <i class="fas fa-check me-1"></i>Used
+                                    </span>
+                                {% else %}
+                                    <span class="badge bg-success">
+                                        <i class="fas fa-check-circle me-1"></i>Valid
+                                    </span>
+                                {% endif %}
+                            {% elif ticket.payment_status == 'pending' %}
+                                <span class="badge bg-warning">
+                                    <i class="fas fa-clock me-1"></i>Pending
+                                </span>
+                            {% else %}
+                                <span class="badge bg-danger">
+                                    <i class="fas fa-times me-1"></i>Failed
+                                </span>
+                            {% endif %}
+                        </div>
+                    </div>
+
+                    <!-- Event Details -->
+                    <div class="row mb-3">
+                        <div class="col-6">
+                            <div class="d-flex align-items-center mb-2">
+                                <i class="fas fa-map-marker-alt text-primary me-2"></i>
+                                <small class="text-muted">{{ ticket.event.location }}</small>
+                            </div>
+                            <div class="d-flex align-items-center">
+                                <i class="fas fa-calendar text-primary me-2"></i>
+                                <small class="text-muted">{{ ticket.event.date.strftime('%m/%d/%Y') }}</small>
+                            </div>
+                        </div>
+                        <div class="col-6 text-end">
+                            <div class="mb-2">
+                                <i class="fas fa-clock text-primary me-2"></i>
+                                <small class="text-muted">{{ ticket.event.date.strftime('%H:%M') }}</small>
+                            </div>
+                            <div>
+                                <i class="fas fa-money-bill text-success me-2"></i>
+                                <strong class="text-success">{{ "{:,.0f}".format(ticket.event.price) }} RWF</strong>
+                            </div>
+                        </div>
+                    </div>
+
+                    <!-- QR Code -->
+                    {% if ticket.payment_status == 'paid' %}
+                    <div class="qr-code-container">
+                        <img src="{{ url_for('ticket_qr', ticket_id=ticket.ticket_id) }}" 
+                             alt="QR Code" class="img-fluid" style="max-width: 180px;" loading="lazy">
+                        <div class="mt-2">
+                            <small class="text-muted">
+                                <i class="fas fa-qrcode me-1"></i>Present at entrance
+                            </small>
+                        </div>
+                    </div>
                     {% endif %}
-                {% elif ticket.payment_status == 'pending' %}
-                    <span class="badge bg-warning">Payment Pending</span>
-                {% else %}
-                    <span class="badge bg-danger">Payment Failed</span>
-                {% endif %}
-            </div>
-            {% if ticket.payment_status == 'paid' %}
-            <div class="qr-code-container">
-                <img src="data:image/png;base64,{{ ticket.qr_image_data }}" alt="QR Code" class="img-fluid" style="max-width: 200px;">
-            </div>
-            {% endif %}
-            <div class="d-grid">
-                <a href="{{ url_for('view_ticket', ticket_id=ticket.ticket_id) }}" class="btn btn-outline-primary">View Details</a>
+
+                    <!-- Action Buttons -->
+                    <div class="d-grid gap-2">
+                        <a href="{{ url_for('view_ticket', ticket_id=ticket.ticket_id) }}" 
+                           class="btn btn-outline-primary">
+                            <i class="fas fa-eye me-2"></i>View Details
+                        </a>
+                        {% if ticket.payment_status == 'paid' and not ticket.is_used %}
+                        <button class="btn btn-outline-secondary btn-sm" onclick="shareTicket('{{ ticket.ticket_id }}')">
+                            <i class="fas fa-share-alt me-2"></i>Share
+                        </button>
+                        {% endif %}
+                    </div>
+
+                    <!-- Purchase Date -->
+                    <div class="text-center mt-3">
+                        <small class="text-muted">
+                            <i class="fas fa-shopping-cart me-1"></i>
+                            Purchased {{ ticket.purchase_date.strftime('%m/%d/%Y at %H:%M') }}
+                        </small>
+                    </div>
+                </div>
             </div>
+            {% endfor %}
         </div>
     </div>
-    {% endfor %}
 </div>
+
+<!-- Pagination -->
+<nav class="d-flex justify-content-between mb-4">
+    {% if request.args.get('cursor') %}
+    <a class="btn btn-outline-secondary" href="{{ url_for('dashboard') }}">
+        <i class="fas fa-angle-double-left me-2"></i>Back to Start
+    </a>
+    {% else %}
+    <span></span>
+    {% endif %}
+    {% if next_cursor %}
+    <a class="btn btn-outline-primary" href="{{ url_for('dashboard', cursor=next_cursor) }}">
+        More Tickets<i class="fas fa-angle-right ms-2"></i>
+    </a>
+    {% endif %}
+</nav>
+
 {% else %}
-<div class="text-center">
-    <i class="fas fa-ticket-alt fa-5x text-muted mb-3"></i>
+<!-- Empty State -->
+<div class="empty-state">
+    <i class="fas fa-ticket-alt"></i>
     <h3>No Tickets Yet</h3>
-    <p class="text-muted">Start by purchasing tickets for upcoming events!</p>
-    <a href="{{ url_for('index') }}" class="btn btn-primary">Browse Events</a>
+    <p>You haven't purchased any tickets yet. Start exploring our amazing events!</p>
+    <a href="{{ url_for('index') }}" class="btn btn-primary btn-lg">
+        <i class="fas fa-search me-2"></i>Browse Events
+    </a>
 </div>
 {% endif %}
-{% endblock %}''',
+{% endblock %}
+
+{% block scripts %}
+<script>
+// Filter functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const filterButtons = document.querySelectorAll('#ticketFilter button');
+    const ticketItems = document.querySelectorAll('.ticket-item');
+
+    filterButtons.forEach(button => {
+        button.addEventListener('click', function() {
+            const filter = this.id.replace('-tab', '');
+            
+            ticketItems.forEach(item => {
+                const status = item.dataset.status;
+                const isUsed = item.dataset.used === 'true';
+                
+                let show = false;
+                
+                switch(filter) {
+                    case 'all':
+                        show = true;
+                        break;
+                    case 'valid':
+                        show = status === 'paid' && !isUsed;
+                        break;
+                    case 'pending':
+                        show = status === 'pending';
+                        break;
+                    case 'used':
+                        show = isUsed;
+                        break;
+                }
+                
+                if (show) {
+                    item.style.display = 'block';
+                    item.style.animation = 'fadeIn 0.5s ease';
+                } else {
+                    item.style.display = 'none';
+                }
+            });
+        });
+    });
+});
+
+// Share ticket function
+function shareTicket(ticketId) {
+    if (navigator.share) {
+        navigator.share({
+            title: 'My Event Ticket',
+            text: 'Check out my ticket for this event!',
+            url: window.location.origin + '/ticket/' + ticketId
+        });
+    } else {
+        // Fallback - copy to clipboard
+        const url = window.location.origin + '/ticket/' + ticketId;
+        navigator.clipboard.writeText(url).then(() => {
+            alert('Ticket link copied to clipboard!');
+        });
+    }
+}
 
+// Add fade in animation
+const style = document.createElement('style');
+style.textContent = `
+    @keyframes fadeIn {
+        from { opacity: 0; transform: translateY(10px); }
+        to { opacity: 1; transform: translateY(0); }
+    }
+`;
+document.head.appendChild(style);
+</script>
+{% endblock %}''',
         'admin_dashboard.html': '''{% extends "base.html" %}
+
 {% block title %}Admin Dashboard - Smart Ticketing{% endblock %}
+
 {% block content %}
 <div class="row">
     <div class="col-12">
-        <h1 class="mb-4"><i class="fas fa-tachometer-alt"></i> Admin Dashboard</h1>
+        <h1 class="mb-4">
+            <i class="fas fa-tachometer-alt"></i> Admin Dashboard
+        </h1>
     </div>
 </div>
+
 <div class="row mb-4">
     <div class="col-md-3">
         <div class="card text-white bg-primary">
@@ -287,7 +958,7 @@ def create_missing_templates():
         <div class="card text-white bg-info">
             <div class="card-body">
                 <h5>Used Tickets</h5>
-                <h2>{{ stats.used_tickets }}</h2>
+                <h2 id="used-tickets">{{ stats.used_tickets }}</h2>
             </div>
         </div>
     </div>
@@ -300,9 +971,13 @@ def create_missing_templates():
         </div>
     </div>
 </div>
+
 <div class="row">
     <div class="col-12">
         <h3>Recent Entry Logs</h3>
+        <p class="text-muted" id="live-status">
+            <i class="fas fa-circle text-secondary"></i> Connecting to live gate activity...
+        </p>
         <div class="table-responsive">
             <table class="table table-striped">
                 <thead>
@@ -315,7 +990,7 @@ def create_missing_templates():
                         <th>Device</th>
                     </tr>
                 </thead>
-                <tbody>
+                <tbody id="entry-rows">
                     {% for entry in recent_entries %}
                     <tr>
                         <td>{{ entry.entry_time.strftime('%Y-%m-%d %H:%M:%S') }}</td>
@@ -337,16 +1012,74 @@ def create_missing_templates():
         </div>
     </div>
 </div>
+{% endblock %}
+
+{% block scripts %}
+<script>
+// Live gate activity pushed from the server; no page refreshes needed during doors
+(function () {
+    const status = document.getElementById('live-status');
+    const rows = document.getElementById('entry-rows');
+    const usedTickets = document.getElementById('used-tickets');
+    const source = new EventSource('{{ url_for('entry_stream') }}');
+
+    function showCounters(counters) {
+        status.innerHTML = '<i class="fas fa-circle text-success"></i> Live: ' +
+            (counters.granted || 0) + ' granted, ' + (counters.denied || 0) + ' denied at this server';
+    }
+
+    function cell(text) {
+        const td = document.createElement('td');
+        td.textContent = text;
+        return td;
+    }
+
+    source.addEventListener('counters', e => showCounters(JSON.parse(e.data)));
+    source.onmessage = e => {
+        const entry = JSON.parse(e.data);
+        showCounters(entry.counters || {});
+
+        const row = document.createElement('tr');
+        row.appendChild(cell(entry.time.replace('T', ' ').slice(0, 19)));
+        row.appendChild(cell(entry.ticket_id || 'N/A'));
+        row.appendChild(cell(entry.user_name || 'Unknown'));
+        row.appendChild(cell(entry.event_name || 'Unknown'));
+        const badge = document.createElement('span');
+        badge.className = 'badge ' + (entry.status === 'granted' ? 'bg-success' : 'bg-danger');
+        badge.textContent = entry.reason ? entry.status + ' (' + entry.reason + ')' : entry.status;
+        const statusCell = document.createElement('td');
+        statusCell.appendChild(badge);
+        row.appendChild(statusCell);
+        row.appendChild(cell(entry.device_id));
+        rows.insertBefore(row, rows.firstChild);
+        while (rows.children.length > 50) {
+            rows.removeChild(rows.lastChild);
+        }
+
+        if (entry.status === 'granted') {
+            usedTickets.textContent = parseInt(usedTickets.textContent, 10) + 1;
+        }
+    };
+    source.onerror = () => {
+        status.innerHTML = '<i class="fas fa-circle text-warning"></i> Reconnecting to live gate activity...';
+    };
+})();
+</script>
 {% endblock %}''',
+        'manage_events.html': '''<!-- templates/manage_events.html -->
+{% extends "base.html" %}
 
-        'manage_events.html': '''{% extends "base.html" %}
 {% block title %}Manage Events - Admin{% endblock %}
+
 {% block content %}
 <div class="row">
     <div class="col-12">
-        <h1 class="mb-4"><i class="fas fa-calendar-plus"></i> Manage Events</h1>
+        <h1 class="mb-4">
+            <i class="fas fa-calendar-plus"></i> Manage Events
+        </h1>
     </div>
 </div>
+
 <div class="row mb-4">
     <div class="col-12">
         <button class="btn btn-primary" data-bs-toggle="modal" data-bs-target="#addEventModal">
@@ -354,6 +1087,7 @@ def create_missing_templates():
         </button>
     </div>
 </div>
+
 <div class="row">
     <div class="col-12">
         <div class="table-responsive">
@@ -366,6 +1100,7 @@ def create_missing_templates():
                         <th>Price</th>
                         <th>Capacity</th>
                         <th>Tickets Sold</th>
+                        <th>Used</th>
                         <th>Status</th>
                         <th>Actions</th>
                     </tr>
@@ -378,7 +1113,8 @@ def create_missing_templates():
                         <td>{{ event.location }}</td>
                         <td>{{ "{:,.0f}".format(event.price) }} RWF</td>
                         <td>{{ event.max_capacity }}</td>
-                        <td>{{ event.tickets|selectattr('payment_status', 'equalto', 'paid')|list|length }}</td>
+                        <td>{{ event.sold_count }}</td>
+                        <td>{{ event.used_count }}</td>
                         <td>
                             {% if event.is_active %}
                                 <span class="badge bg-success">Active</span>
@@ -395,8 +1131,24 @@ def create_missing_templates():
                 </tbody>
             </table>
         </div>
+        <nav class="d-flex justify-content-between">
+            {% if request.args.get('cursor') %}
+            <a class="btn btn-outline-secondary btn-sm" href="{{ url_for('manage_events') }}">
+                <i class="fas fa-angle-double-left"></i> Latest
+            </a>
+            {% else %}
+            <span></span>
+            {% endif %}
+            {% if next_cursor %}
+            <a class="btn btn-outline-secondary btn-sm" href="{{ url_for('manage_events', cursor=next_cursor) }}">
+                Older <i class="fas fa-angle-right"></i>
+            </a>
+            {% endif %}
+        </nav>
     </div>
 </div>
+
+<!-- Add Event Modal -->
 <div class="modal fade" id="addEventModal" tabindex="-1">
     <div class="modal-dialog">
         <div class="modal-content">
@@ -410,18 +1162,22 @@ def create_missing_templates():
                         <label for="name" class="form-label">Event Name</label>
                         <input type="text" class="form-control" id="name" name="name" required>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="description" class="form-label">Description</label>
                         <textarea class="form-control" id="description" name="description" rows="3"></textarea>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="date" class="form-label">Date & Time</label>
                         <input type="datetime-local" class="form-control" id="date" name="date" required>
                     </div>
+                    
                     <div class="mb-3">
                         <label for="location" class="form-label">Location</label>
                         <input type="text" class="form-control" id="location" name="location" required>
                     </div>
+                    
                     <div class="row">
                         <div class="col-md-6">
                             <div class="mb-3">
@@ -445,16 +1201,33 @@ def create_missing_templates():
         </div>
     </div>
 </div>
-{% endblock %}''',
+{% endblock %}
+''',
+        'manage_users.html': '''
+<!-- templates/manage_users.html -->
+{% extends "base.html" %}
 
-        'manage_users.html': '''{% extends "base.html" %}
 {% block title %}Manage Users - Admin{% endblock %}
+
 {% block content %}
 <div class="row">
     <div class="col-12">
-        <h1 class="mb-4"><i class="fas fa-users"></i> Manage Users</h1>
+        <h1 class="mb-4">
+            <i class="fas fa-users"></i> Manage Users
+        </h1>
     </div>
 </div>
+
+<div class="row mb-4">
+    <div class="col-md-6">
+        <form method="GET" class="input-group">
+            <input type="search" class="form-control" name="q" value="{{ search }}"
+                   placeholder="Username, email or phone starts with...">
+            <button type="submit" class="btn btn-primary"><i class="fas fa-search"></i> Search</button>
+        </form>
+    </div>
+</div>
+
 <div class="row">
     <div class="col-12">
         <div class="table-responsive">
@@ -479,7 +1252,7 @@ def create_missing_templates():
                         <td>{{ user.email }}</td>
                         <td>{{ user.phone }}</td>
                         <td>{{ user.created_at.strftime('%Y-%m-%d') }}</td>
-                        <td>{{ user.tickets|length }}</td>
+                        <td>{{ user.ticket_count }}</td>
                         <td>
                             {% if user.is_admin %}
                                 <span class="badge bg-danger">Admin</span>
@@ -498,10 +1271,24 @@ def create_missing_templates():
                 </tbody>
             </table>
         </div>
+        <nav class="d-flex justify-content-between">
+            {% if request.args.get('cursor') %}
+            <a class="btn btn-outline-secondary btn-sm" href="{{ url_for('manage_users', q=search or None) }}">
+                <i class="fas fa-angle-double-left"></i> Newest
+            </a>
+            {% else %}
+            <span></span>
+            {% endif %}
+            {% if next_cursor %}
+            <a class="btn btn-outline-secondary btn-sm" href="{{ url_for('manage_users', q=search or None, cursor=next_cursor) }}">
+                Older <i class="fas fa-angle-right"></i>
+            </a>
+            {% endif %}
+        </nav>
     </div>
 </div>
-{% endblock %}''',
-
+{% endblock %}
+''',
         'purchase.html': '''{% extends "base.html" %}
 {% block title %}Purchase Ticket - {{ event.name }}{% endblock %}
 {% block content %}
@@ -546,7 +1333,6 @@ def create_missing_templates():
     </div>
 </div>
 {% endblock %}''',
-
         'ticket_detail.html': '''{% extends "base.html" %}
 {% block title %}Ticket Details - {{ ticket.event.name }}{% endblock %}
 {% block content %}
@@ -585,7 +1371,7 @@ def create_missing_templates():
                 {% if ticket.payment_status == 'paid' %}
                 <div class="qr-code-container mb-4">
                     <div class="border p-3 d-inline-block bg-white">
-                        <img src="data:image/png;base64,{{ ticket.qr_image_data }}" alt="QR Code" class="img-fluid" style="max-width: 300px;">
+                        <img src="{{ url_for('ticket_qr', ticket_id=ticket.ticket_id) }}" alt="QR Code" class="img-fluid" style="max-width: 300px;">
                     </div>
                     <p class="text-muted mt-2">Present this QR code at the entrance</p>
                 </div>
@@ -604,6 +1390,25 @@ def create_missing_templates():
         </div>
     </div>
 </div>
+{% endblock %}
+{% block scripts %}
+{% if ticket.payment_status == 'pending' %}
+<script>
+// Poll the payment status until the mobile money request settles
+(function pollPaymentStatus() {
+    fetch('{{ url_for('ticket_status', ticket_id=ticket.ticket_id) }}', {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(data => {
+            if (data.payment_status === 'pending') {
+                setTimeout(pollPaymentStatus, 2000);
+            } else {
+                window.location.reload();
+            }
+        })
+        .catch(() => setTimeout(pollPaymentStatus, 5000));
+})();
+</script>
+{% endif %}
 {% endblock %}'''
     }
     